@@ -0,0 +1,125 @@
+"""A local HTTP server answering the GitHub REST API calls made by GithubFactory, from a synthetic repository."""
+import json
+import re
+import threading
+import time
+
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+def iso(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+class FakeGithub:
+    """Serves a repository, its default branch tree, and the pull requests, issues, comments and files of `make_repository`.
+    
+    Every response carries generous rate-limit headers, so the fetch engine never waits, and the number of requests is counted."""
+    
+    def __init__(self, fullName: str, repository: dict, tree: list, repositoryId: int = 1):
+        self.fullName = fullName
+        self.repository = repository
+        self.tree = tree
+        self.repositoryId = repositoryId
+        self.pulls = {pull["number"]: pull for pull in repository["pulls"]}
+        self.issues = {pull["issue"]: pull for pull in repository["pulls"]}
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.__handler())
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = None
+    
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+    
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def __handler(self):
+        fake = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with fake.lock:
+                    fake.requests += 1
+                status, body = fake.route(urlparse(self.path).path)
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("X-RateLimit-Limit", "5000")
+                self.send_header("X-RateLimit-Remaining", "5000")
+                self.send_header("X-RateLimit-Reset", str(int(time.time()) + 3600))
+                self.end_headers()
+                self.wfile.write(data)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return Handler
+    
+    def route(self, path: str):
+        """Answers one GET request.
+        
+        Returns:
+            tuple[int, object]: The status and the JSON body."""
+        repo = f"/repos/{self.fullName}"
+        url = self.base_url + repo
+        if path == "/rate_limit":
+            limit = {"limit": 5000, "remaining": 5000, "reset": int(time.time()) + 3600, "used": 0}
+            return 200, {"resources": {"core": limit, "search": limit}, "rate": limit}
+        if path == "/search/issues":
+            items = [self.__issue(pull, pullRequest=True) for pull in self.repository["pulls"]]
+            return 200, {"total_count": len(items), "incomplete_results": False, "items": items}
+        if path == repo:
+            return 200, {
+                "id": self.repositoryId, "name": self.fullName.split("/")[-1], "full_name": self.fullName, "description": "Synthetic repository",
+                "language": "Python", "stargazers_count": 0, "default_branch": "main", "url": url,
+            }
+        match = re.fullmatch(re.escape(repo) + r"/(branches/main|git/trees/(\w+)|pulls/(\d+)(/comments|/files)?|issues/(\d+)(/comments)?)", path)
+        if match is None:
+            return 404, {"message": "Not Found"}
+        if match.group(1) == "branches/main":
+            head = self.repository["commits"][-1]["sha"]
+            return 200, {"name": "main", "commit": {"sha": head, "url": f"{url}/commits/{head}"}}
+        if match.group(2):
+            return 200, {"sha": match.group(2), "url": f"{url}/git/trees/{match.group(2)}", "truncated": False, "tree": [
+                {"path": file_path, "mode": "100644", "type": "blob", "sha": sha, "url": f"{url}/git/blobs/{sha}"} for file_path, sha in self.tree
+            ]}
+        if match.group(3):
+            pull = self.pulls.get(int(match.group(3)))
+            if pull is None:
+                return 404, {"message": "Not Found"}
+            if match.group(4) == "/comments":
+                return 200, []
+            if match.group(4) == "/files":
+                return 200, [{"filename": f["filename"], "sha": f["sha"], "status": "modified", "patch": "@@ -1 +1 @@", "additions": 1, "deletions": 1, "changes": 2} for f in pull["files"]]
+            return 200, {
+                "id": 100000 + pull["number"], "number": pull["number"], "title": pull["title"], "body": pull["body"], "state": "closed",
+                "merged": True, "base": {"ref": "main", "sha": pull["base"]}, "updated_at": iso(pull["updated_at"]),
+                "url": f"{url}/pulls/{pull['number']}", "html_url": f"https://github.com/{self.fullName}/pull/{pull['number']}",
+            }
+        pull = self.issues.get(int(match.group(5)))
+        if pull is None:
+            return 404, {"message": "Not Found"}
+        if match.group(6):
+            return 200, [{"id": 300000 + 100 * pull["issue"] + i, "body": body, "url": f"{url}/issues/comments/{300000 + 100 * pull['issue'] + i}"} for i, body in enumerate(pull["comments"])]
+        return 200, self.__issue(pull)
+    
+    def __issue(self, pull, pullRequest = False):
+        """The JSON of the issue of a pull request, or of the pull request itself as returned by the issue search."""
+        url = f"{self.base_url}/repos/{self.fullName}"
+        if pullRequest:
+            return {
+                "id": 200000 + pull["number"], "number": pull["number"], "title": pull["title"], "body": pull["body"], "state": "closed",
+                "url": f"{url}/issues/{pull['number']}", "updated_at": iso(pull["updated_at"]),
+                "pull_request": {"url": f"{url}/pulls/{pull['number']}", "html_url": f"https://github.com/{self.fullName}/pull/{pull['number']}"},
+            }
+        return {
+            "id": 200000 + pull["issue"], "number": pull["issue"], "title": pull["issue_title"], "body": pull["issue_body"], "state": "closed",
+            "url": f"{url}/issues/{pull['issue']}", "updated_at": iso(pull["updated_at"]),
+        }
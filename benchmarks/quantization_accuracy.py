@@ -0,0 +1,100 @@
+"""Checks the accuracy and the speed of the int8 CodeT5 pipeline against the fp32 one.
+
+The corpus is fixed: the Python functions of a directory (this repository by default) and a list of issue texts.
+Both precisions summarize and encode every function, then every issue is scored against the corpus. The script reports
+how often the summaries are identical, the cosine similarity between the fp32 and int8 embeddings of each function,
+the agreement of the file rankings (same best file, overlap of the top k files) and the time spent by each precision.
+
+Usage:
+    python benchmarks/quantization_accuracy.py [--repo .] [--issues issues.txt] [--k 10] [--json accuracy.json]"""
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+from interfaces.GitReader import WorkTreeReader
+from interfaces.Semantic.FunctionCatalogue import FunctionCatalogue
+from interfaces.Semantic.LocalModels import LocalModels
+from utils.rankings import rank_files
+
+ISSUES = [
+    "The database is locked when several commands run at the same time",
+    "Rate limit exceeded while fetching the pull requests of a repository",
+    "Embeddings are recomputed for files that did not change",
+    "Crash when a pull request has no linked issue",
+    "The comments of an issue are inserted twice",
+    "Wrong file path on Windows when reading the repository",
+]
+
+def run(models, functions, issues, batch_size):
+    """Summarizes and encodes the corpus and the issues with one precision.
+    
+    Returns:
+        tuple[list[str], np.ndarray, np.ndarray, float]: The summaries, the function embeddings, the issue embeddings and the time spent in seconds."""
+    start = time.perf_counter()
+    summaries = []
+    for i in range(0, len(functions), batch_size):
+        summaries.extend(models.summarize([source for _, _, source in functions[i:i + batch_size]]))
+    code = np.concatenate([models.encode(summaries[i:i + batch_size]) for i in range(0, len(summaries), batch_size)])
+    queries = models.encode(issues)
+    return summaries, code, queries, time.perf_counter() - start
+
+def normalize(matrix):
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-8)
+
+def main():
+    parser = argparse.ArgumentParser(description="Accuracy of the int8 CodeT5 pipeline against fp32")
+    parser.add_argument("--repo", default=".", help="Directory whose Python functions form the corpus")
+    parser.add_argument("--issues", help="File with one issue text per line")
+    parser.add_argument("--max-functions", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--json", help="Writes the report to this file")
+    args = parser.parse_args()
+    load_dotenv()
+    
+    if args.issues:
+        with open(args.issues, encoding="utf-8") as f:
+            issues = [line.strip() for line in f if line.strip()]
+    else:
+        issues = ISSUES
+    catalogue = FunctionCatalogue(workers=1)
+    catalogue.refresh(WorkTreeReader(args.repo))
+    functions = sorted(catalogue.functions())[:args.max_functions]
+    paths = [file_path for file_path, _, _ in functions]
+    
+    results = {}
+    for precision in LocalModels.PRECISIONS:
+        summaries, code, queries, seconds = run(LocalModels(device="cpu", precision=precision), functions, issues, args.batch_size)
+        rankings = [rank_files(paths, scores, args.k) for scores in normalize(queries) @ normalize(code).T]
+        results[precision] = (summaries, code, rankings, seconds)
+        print(f"{precision}: {seconds:.1f}s for {len(functions)} functions and {len(issues)} issues")
+    
+    (fp32_summaries, fp32_code, fp32_rankings, fp32_seconds) = results["fp32"]
+    (int8_summaries, int8_code, int8_rankings, int8_seconds) = results["int8"]
+    cosine = np.sum(normalize(fp32_code) * normalize(int8_code), axis=1)
+    overlaps = [len({p for p, _ in a} & {p for p, _ in b}) / max(len(a), 1) for a, b in zip(fp32_rankings, int8_rankings)]
+    report = {
+        "functions": len(functions),
+        "issues": len(issues),
+        "speedup": fp32_seconds / int8_seconds,
+        "identical_summaries": float(np.mean([a == b for a, b in zip(fp32_summaries, int8_summaries)])),
+        "embedding_cosine_mean": float(cosine.mean()),
+        "embedding_cosine_min": float(cosine.min()),
+        "same_top1": float(np.mean([bool(a and b) and a[0][0] == b[0][0] for a, b in zip(fp32_rankings, int8_rankings)])),
+        f"overlap_at_{args.k}": float(np.mean(overlaps)),
+    }
+    for name, value in report.items():
+        print(f"{name}: {value:.3f}" if isinstance(value, float) else f"{name}: {value}")
+    
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
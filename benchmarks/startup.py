@@ -0,0 +1,76 @@
+"""Measures the startup cost of every command of main.py.
+
+Each command is started with `python -X importtime main.py <command> --help`, which configures the container and imports
+everything the CLI needs before the command itself runs. The wall time of the process and the cumulative import time
+of the heaviest top-level modules are reported.
+
+Usage:
+    python benchmarks/startup.py [--runs 3] [--top 10] [--json startup.json] [command ...]"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COMMANDS = ["find-repo", "get-data-repo", "semantic-test-repo", "db-stats"]
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+def measure(command: str, env: dict):
+    """Starts the command once.
+    
+    Args:
+        command (str): The name of the command.
+        env (dict): The environment of the process.
+    
+    Returns:
+        tuple[float, dict[str, float]]: The wall time of the process in seconds, and the cumulative import time in seconds of each top-level module."""
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, "-X", "importtime", "main.py", command, "--help"], cwd=ROOT, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if process.returncode != 0:
+        raise RuntimeError(f"{command} failed:\n{process.stderr[-2000:]}")
+    
+    modules = {}
+    for line in process.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match and len(match.group(3)) == 1:
+            modules[match.group(4)] = modules.get(match.group(4), 0) + int(match.group(2)) / 1e6
+    return wall, modules
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time of the commands of main.py")
+    parser.add_argument("commands", nargs="*", default=COMMANDS)
+    parser.add_argument("--runs", type=int, default=3, help="Number of runs per command, the median is reported")
+    parser.add_argument("--top", type=int, default=10, help="Number of top-level imports to report per command")
+    parser.add_argument("--json", help="Writes the report to this file")
+    args = parser.parse_args()
+    
+    env = dict(os.environ)
+    tmp = tempfile.TemporaryDirectory()
+    env.setdefault("SQLITE_PATH", os.path.join(tmp.name, "startup.db"))
+    env.setdefault("EMBEDDING_CACHE_PATH", os.path.join(tmp.name, "cache.db"))
+    
+    report = {}
+    for command in args.commands:
+        runs = [measure(command, env) for _ in range(args.runs)]
+        walls = [wall for wall, _ in runs]
+        modules = runs[walls.index(statistics.median_low(walls))][1]
+        top = sorted(modules.items(), key=lambda x: x[1], reverse=True)[:args.top]
+        report[command] = {"wall_s": statistics.median(walls), "imports_s": sum(modules.values()), "top_imports": dict(top)}
+        
+        print(f"{command}: {report[command]['wall_s']:.3f}s wall, {report[command]['imports_s']:.3f}s of imports")
+        for module, seconds in top:
+            print(f"    {module:<40} {seconds:.3f}s")
+    
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    tmp.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Offline benchmark of the whole pipeline, on a synthetic repository served by a fake GitHub.
+
+A repository and its history are generated with `synthetic_repo`, its pull requests and issues are served by `fake_github`,
+and CodeT5 runs with the deterministic `stub_models`, so nothing is downloaded and the runs are comparable.
+Each stage is timed separately and the report is written as JSON:
+
+    generate      synthetic repository and history
+    fetch         repository, file tree, pull requests, issues, comments and files from the fake GitHub
+    ingest        database writes of get-data-repo
+    ast           extraction of the functions of the last commit with a fresh FunctionCatalogue
+    embedding     CodeT5.prepare over the planned commits of semantic-test-repo
+    scoring       CodeT5.score of every issue
+    write         file id resolution and test result writes
+
+Usage:
+    python benchmarks/suite.py [--files 200] [--functions 10] [--commits 50] [--json report.json]"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_github import FakeGithub
+from stub_models import StubModels
+from synthetic_repo import make_repository
+
+class Timer:
+    """Accumulates the time and the number of items of each stage."""
+    
+    def __init__(self):
+        self.stages = {}
+    
+    def add(self, stage: str, seconds: float, items: int = 0):
+        entry = self.stages.setdefault(stage, {"seconds": 0.0, "items": 0})
+        entry["seconds"] += seconds
+        entry["items"] += items
+    
+    def report(self):
+        for entry in self.stages.values():
+            entry["ms_per_item"] = 1000 * entry["seconds"] / entry["items"] if entry["items"] else None
+        return self.stages
+
+def configure(workdir: str, base_url: str):
+    """Points the application at the work directory and the fake GitHub, then builds the container like main.py does, with the stub models."""
+    os.environ.update({
+        "SQLITE_PATH": os.path.join(workdir, "bench.db"),
+        "EMBEDDING_INDEX_PATH": os.path.join(workdir, "embeddings"),
+        "EMBEDDING_CACHE_PATH": os.path.join(workdir, "cache.db"),
+        "GITHUB_API_URL": base_url,
+        "GITHUB_TOKEN": "offline-benchmark",
+    })
+    os.environ.pop("GITHUB_CACHE_PATH", None)
+    
+    import main
+    from interfaces.Semantic.CodeT5 import CodeT5
+    from utils.containers import Container, providers
+    
+    container = Container()
+    getattr(main, "__configure_session")(container)
+    container.semantic_test.override(providers.Factory(CodeT5, models=StubModels(), cache=container.embedding_cache))
+    return main, container
+
+def run(args, timer: Timer):
+    from interfaces.Database.FileIdResolver import FileIdResolver
+    from interfaces.GitReader import GitReader
+    from interfaces.Semantic.FunctionCatalogue import FunctionCatalogue
+    from utils.missingFileException import MissingFileException
+    from utils.workPlan import issue_text, plan_commits
+    
+    name = "bench/synthetic"
+    path = os.path.join(".", "test", "synthetic")
+    
+    start = time.perf_counter()
+    repository = make_repository(path, args.files, args.functions, args.commits, args.changes, args.comments, args.seed)
+    head = repository["commits"][-1]["sha"]
+    reader = GitReader(path)
+    tree = reader.list_entries(head)
+    timer.add("generate", time.perf_counter() - start, len(repository["commits"]))
+    
+    github = FakeGithub(name, repository, tree).start()
+    try:
+        main, container = configure(os.getcwd(), github.base_url)
+        sqlite = container.db_interface()
+        githubFactory = container.git_factory()
+        
+        start = time.perf_counter()
+        repositoryItem = githubFactory.get_repository(name)
+        gitFiles = list(githubFactory.get_gitFiles(path))
+        pullList, pulls, issueNumbers = githubFactory.get_pull_requests()
+        pullData = list(githubFactory.fetch_pull_data(pulls, issueNumbers))
+        timer.add("fetch", time.perf_counter() - start, github.requests)
+    finally:
+        github.stop()
+    
+    start = time.perf_counter()
+    sqlite.insert(repositoryItem)
+    githubFactory.get_file_resolver().add_missing(gitFiles)
+    main.ingest_pull_data(sqlite, githubFactory, repositoryItem.id, pulls, pullList, pullData, {})
+    timer.add("ingest", time.perf_counter() - start, len(pulls))
+    
+    start = time.perf_counter()
+    catalogue = FunctionCatalogue()
+    catalogue.refresh(reader, head)
+    functions = catalogue.functions()
+    catalogue.close()
+    timer.add("ast", time.perf_counter() - start, len(functions))
+    
+    semantic = container.semantic_test()
+    embedding = container.db_embedding()
+    semantic.init_repo(name, embedding)
+    fileResolver = FileIdResolver(sqlite, repositoryItem.id)
+    issues = sqlite.get_pending_issues(name)
+    plan = plan_commits(issues, reader.commit_times({sha for _, _, sha, _ in issues}))
+    reader.close()
+    
+    for sha, group in plan:
+        start = time.perf_counter()
+        semantic.prepare(githubFactory.setup_repo(sha, name, path, checkout = False), sha)
+        timer.add("embedding", time.perf_counter() - start, 1)
+        
+        for title, body, issueId in group:
+            start = time.perf_counter()
+            results = semantic.score(issue_text(title, body), args.top_k)
+            timer.add("scoring", time.perf_counter() - start, 1)
+            
+            start = time.perf_counter()
+            ranking = []
+            for file_path, score in results:
+                try:
+                    ranking.append((fileResolver.get(file_path), score))
+                except MissingFileException:
+                    pass
+            sqlite.insert_test_result(issueId, ranking)
+            timer.add("write", time.perf_counter() - start, 1)
+    
+    return {"issues": len(issues), "commits_planned": len(plan), "functions": len(functions), "github_requests": github.requests}
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the pipeline on a synthetic repository")
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--functions", type=int, default=10, help="Functions per file")
+    parser.add_argument("--commits", type=int, default=50)
+    parser.add_argument("--changes", type=int, default=5, help="Files rewritten per commit")
+    parser.add_argument("--comments", type=int, default=2, help="Comments per issue")
+    parser.add_argument("--top-k", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="Empty directory for the repository and the databases, a temporary one by default")
+    parser.add_argument("--json", help="Writes the report to this file instead of the standard output")
+    args = parser.parse_args()
+    output = os.path.abspath(args.json) if args.json else None
+    
+    tmp = None
+    if args.workdir:
+        if os.path.isdir(args.workdir) and os.listdir(args.workdir):
+            parser.error(f"the work directory {args.workdir} is not empty, the repository and the databases of a previous run would be reused")
+        os.makedirs(args.workdir, exist_ok=True)
+        workdir = args.workdir
+    else:
+        tmp = tempfile.TemporaryDirectory()
+        workdir = tmp.name
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        timer = Timer()
+        counts = run(args, timer)
+    finally:
+        os.chdir(cwd)
+        if tmp is not None:
+            tmp.cleanup()
+    
+    report = {
+        "config": {key: value for key, value in vars(args).items() if key not in ("json", "workdir")},
+        "counts": counts,
+        "stages": timer.report(),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+    }
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
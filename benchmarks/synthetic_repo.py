@@ -0,0 +1,84 @@
+"""Generates synthetic Python repositories with a git history, and the pull requests and issues matching that history."""
+import os
+import random
+import subprocess
+
+VERBS = ["load", "save", "parse", "render", "fetch", "update", "compute", "merge", "split", "encode", "decode", "validate", "index", "resolve", "schedule"]
+NOUNS = ["user", "token", "config", "cache", "record", "session", "payload", "matrix", "request", "commit", "branch", "report", "index", "message", "queue"]
+WORDS = ["invalid", "missing", "slow", "duplicate", "empty", "large", "remote", "local", "broken", "stale", "timeout", "encoding", "unicode", "retry", "limit"]
+START_TIME = 1700000000
+
+def make_function(rng, name):
+    """Writes the source of one function, with a docstring and a few statements using words of the vocabulary."""
+    words = rng.sample(WORDS, 3)
+    lines = [f"def {name}({rng.choice(NOUNS)}, {rng.choice(NOUNS)}_id=None):", f'    """{" ".join(words).capitalize()} {name.replace("_", " ")}."""']
+    for i in range(rng.randint(2, 8)):
+        lines.append(f"    {rng.choice(WORDS)}_{i} = {rng.choice(VERBS)}_{rng.choice(NOUNS)}({rng.choice(NOUNS)})  # {rng.choice(WORDS)}")
+    lines.append(f"    return {rng.choice(WORDS)}_0")
+    return "\n".join(lines) + "\n"
+
+def make_file(rng, functions):
+    names = [f"{rng.choice(VERBS)}_{rng.choice(NOUNS)}_{i}" for i in range(functions)]
+    return f'"""Module handling {rng.choice(NOUNS)} {rng.choice(WORDS)} cases."""\n\n' + "\n\n".join(make_function(rng, name) for name in names)
+
+def git(path, *args, env = None):
+    return subprocess.run(["git", "-c", "user.name=bench", "-c", "user.email=bench@localhost", *args], cwd=path, env=env, capture_output=True, text=True, check=True).stdout
+
+def make_repository(path: str, files: int = 50, functions: int = 10, commits: int = 20, changes: int = 3, comments: int = 2, seed: int = 0):
+    """Creates a git repository of Python files and a history where every commit rewrites a few files.
+    
+    Every commit after the first one is described by a merged pull request whose base is the previous commit, linked to an issue
+    whose text is taken from the docstrings of the changed files.
+    
+    Args:
+        path (str): The directory of the repository, created if needed.
+        files (int): The number of Python files.
+        functions (int): The number of functions per file.
+        commits (int): The number of commits.
+        changes (int): The number of files rewritten by each commit after the first.
+        comments (int): The number of comments of each issue.
+        seed (int): The seed of the generator, the same seed gives the same files.
+    
+    Returns:
+        dict: The commits, as {"sha", "time", "changed"} dicts, and the pull requests, as dicts with their number, issue, base sha, files and comments."""
+    rng = random.Random(seed)
+    os.makedirs(path, exist_ok=True)
+    git(path, "init", "-q", "-b", "main")
+    paths = [os.path.join(f"pkg{i % 5}", f"module_{i}.py") for i in range(files)]
+    
+    history, pulls = [], []
+    for number in range(commits):
+        changed = paths if number == 0 else rng.sample(paths, min(changes, len(paths)))
+        for file_path in changed:
+            os.makedirs(os.path.join(path, os.path.dirname(file_path)), exist_ok=True)
+            with open(os.path.join(path, file_path), "w", encoding="utf-8") as f:
+                f.write(make_file(rng, functions))
+        timestamp = str(START_TIME + 3600 * number)
+        env = dict(os.environ, GIT_AUTHOR_DATE=f"{timestamp} +0000", GIT_COMMITTER_DATE=f"{timestamp} +0000")
+        git(path, "add", "-A")
+        git(path, "commit", "-q", "-m", f"Commit {number}", env=env)
+        sha = git(path, "rev-parse", "HEAD").strip()
+        history.append({"sha": sha, "time": int(timestamp), "changed": list(changed)})
+        
+        if number == 0:
+            continue
+        entries = {}
+        for line in git(path, "ls-tree", "-r", sha).splitlines():
+            meta, file_path = line.split("\t", 1)
+            entries[file_path] = meta.split()[2]
+        issue = 2 * number - 1
+        words = " ".join(rng.sample(WORDS, 4))
+        name = changed[0].rsplit("/", 1)[-1][:-3].replace("_", " ")
+        pulls.append({
+            "number": 2 * number,
+            "issue": issue,
+            "title": f"Fix #{issue}: {words}",
+            "body": f"Closes #{issue}",
+            "base": history[number - 1]["sha"],
+            "updated_at": int(timestamp),
+            "issue_title": f"{words.capitalize()} in {name}",
+            "issue_body": f"The {name} module fails with {rng.choice(WORDS)} {rng.choice(NOUNS)} values.",
+            "files": [{"filename": file_path, "sha": entries[file_path]} for file_path in changed],
+            "comments": [f"Also seen with {rng.choice(WORDS)} {rng.choice(NOUNS)}" for _ in range(comments)],
+        })
+    return {"commits": history, "pulls": pulls}
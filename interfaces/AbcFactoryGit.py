@@ -13,19 +13,27 @@ class AbcFactoryGit(ABC):
         raise NotImplementedError()
     
     @abstractmethod
-    def get_comments(self, issue: Issue, issueId: int):
+    def get_comments(self, issue: Issue, issueId: int, comments: list = None):
         raise NotImplementedError()
     
     @abstractmethod
-    def get_pull_requests(self):
+    def get_pull_requests(self, since = None):
         raise NotImplementedError()
     
     @abstractmethod
-    def get_modified_files(self, pull: PullRequest, pullId: int):
+    def get_modified_files(self, pull: PullRequest, pullId: int, files: list = None):
         raise NotImplementedError()
     
     @abstractmethod
-    def get_gitFiles(self):
+    def fetch_pull_data(self, pulls: list, issueNumbers: list):
+        raise NotImplementedError()
+    
+    @abstractmethod
+    def get_gitFiles(self, path_repos: str = None):
+        raise NotImplementedError()
+    
+    @abstractmethod
+    def get_file_resolver(self):
         raise NotImplementedError()
     
     @abstractmethod
@@ -33,5 +41,9 @@ class AbcFactoryGit(ABC):
         raise NotImplementedError()
     
     @abstractmethod
-    def setup_repo(self, shaBase, repoFullName: str, path_repos: str):
+    def clone_repo(self, repoFullName: str, path_repos: str):
+        raise NotImplementedError()
+    
+    @abstractmethod
+    def setup_repo(self, shaBase, repoFullName: str, path_repos: str, checkout: bool = True):
         raise NotImplementedError()
\ No newline at end of file
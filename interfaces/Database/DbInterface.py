@@ -6,7 +6,9 @@ from models.issue import Issue
 from models.modifiedFiles import ModifiedFiles
 from models.pullRequest import PullRequest
 from models.repository import Repository
+from models.syncState import SyncState
 from models.testResult import TestResult
+from models.testResultRank import TestResultRank
 from typing import List
 
 class DbInterface(ABC):
@@ -19,6 +21,14 @@ class DbInterface(ABC):
     def insert_many(self, data: List[ModifiedFiles | Comment | GitFile]):
         raise NotImplementedError()
     
+    @abstractmethod
+    def transaction(self):
+        raise NotImplementedError()
+    
+    @abstractmethod
+    def commit_pending(self):
+        raise NotImplementedError()
+    
     @abstractmethod
     def update_issueId_pullRequest(self, pullId: int, issueId: int):
         raise NotImplementedError()
@@ -31,10 +41,58 @@ class DbInterface(ABC):
     def get_shas_texts_and_issueId(self, repositoryName: str):
         raise NotImplementedError()
     
+    @abstractmethod
+    def insert_test_result(self, issueId: int, ranking: list, full_ranking: bytes = None):
+        raise NotImplementedError()
+    
+    @abstractmethod
+    def get_top_files(self, issueId: int, k: int = None):
+        raise NotImplementedError()
+    
+    @abstractmethod
+    def get_pending_issues(self, repositoryName: str):
+        raise NotImplementedError()
+    
     @abstractmethod
     def get_repoId_from_repoName(self, repositoryName: str):
         raise NotImplementedError()
     
     @abstractmethod
     def issue_exists(self, issueId: int):
+        raise NotImplementedError()
+    
+    @abstractmethod
+    def repository_exists(self, repoId: int):
+        raise NotImplementedError()
+    
+    @abstractmethod
+    def get_file_ids(self, repoId: int):
+        raise NotImplementedError()
+    
+    @abstractmethod
+    def insert_gitFiles(self, gitFiles: List[GitFile]):
+        raise NotImplementedError()
+    
+    @abstractmethod
+    def get_ingested_pulls(self, repoId: int):
+        raise NotImplementedError()
+    
+    @abstractmethod
+    def get_comment_ids(self, issueId: int):
+        raise NotImplementedError()
+    
+    @abstractmethod
+    def get_sync_state(self, repoId: int):
+        raise NotImplementedError()
+    
+    @abstractmethod
+    def save_sync_state(self, repoId: int, lastUpdatedAt, lastPullGithubId: int):
+        raise NotImplementedError()
+    
+    @abstractmethod
+    def get_table_sizes(self):
+        raise NotImplementedError()
+    
+    @abstractmethod
+    def get_query_plans(self):
         raise NotImplementedError()
\ No newline at end of file
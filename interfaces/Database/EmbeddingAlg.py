@@ -16,9 +16,9 @@ class Embeddings2(Base):
 
 class EmbeddingAlg(EmbeddingDbI):
     def __init__(self) -> None:
-        engine = create_engine('sqlite:///Embeddings2.db')
-        Base.metadata.create_all(engine)
-        self.conn = engine.connect()
+        self.engine = create_engine('sqlite:///Embeddings2.db')
+        Base.metadata.create_all(self.engine)
+        self.conn = self.engine.connect()
     
     def get_embedding(self, file_path, function_name = None):
         """Retrieves an embedding from the database for the given file path and function name.
@@ -54,6 +54,15 @@ class EmbeddingAlg(EmbeddingDbI):
         else:
             self.conn.execute(old)
     
+    def flush(self):
+        """Commits the embeddings saved on the connection."""
+        self.conn.commit()
+    
+    def reset_connections(self):
+        """Drops the connection inherited from the parent process without closing it, and opens a new one for the forked process."""
+        self.engine.dispose(close=False)
+        self.conn = self.engine.connect()
+    
     def clean(self):
         """Closes the database connection and removes the SQLite database file.
         
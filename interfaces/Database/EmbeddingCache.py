@@ -0,0 +1,155 @@
+import hashlib
+import os
+import textwrap
+import time
+
+from utils.vectors import encode_vector, decode_vector
+from sqlalchemy import Column, Integer, Float, String, BLOB, create_engine, delete, event, func, select, text, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.declarative import declarative_base
+
+Base = declarative_base()
+
+class CacheEntry(Base):
+    __tablename__ = 'entries'
+    
+    hash = Column(String, primary_key=True)
+    embedding = Column(BLOB)
+    size = Column(Integer)
+    lastUsed = Column(Float, index=True)
+
+def source_hash(source: str, model_ids: tuple) -> str:
+    """Computes the content address of a function for a given set of models.
+    
+    The source is normalized before hashing (common indentation removed, trailing whitespace and blank lines dropped),
+    so a function keeps its hash when it is moved, renamed with its file or re-indented.
+    
+    Args:
+        source (str): The source code of the function.
+        model_ids (tuple): The identifiers of the models producing the embedding.
+    
+    Returns:
+        str: The hexadecimal sha256 of the models and the normalized source."""
+    lines = [line.rstrip() for line in textwrap.dedent(source).splitlines()]
+    normalized = "\n".join(line for line in lines if line)
+    digest = hashlib.sha256()
+    for model_id in model_ids:
+        digest.update(str(model_id).encode("utf-8") + b"\0")
+    digest.update(normalized.encode("utf-8"))
+    return digest.hexdigest()
+
+class EmbeddingCache:
+    """Content-addressed embedding cache shared by every repository.
+    
+    Embeddings are stored by `source_hash`.
+    The total size of the stored embeddings is bounded by `max_bytes`: the least recently used entries are evicted first."""
+    
+    def __init__(self, db_path: str = None, max_bytes: int = None) -> None:
+        self.db_path = db_path or os.getenv("EMBEDDING_CACHE_PATH", "./EmbeddingCache.db")
+        self.max_bytes = max_bytes or int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", 1 << 30))
+        self.engine = create_engine('sqlite:///' + self.db_path)
+        event.listen(self.engine, "connect", self.__set_pragmas)
+        Base.metadata.create_all(self.engine)
+        with self.engine.begin() as conn:
+            # The (file_path, function_name) -> hash mapping of older versions was never read
+            conn.execute(text("DROP TABLE IF EXISTS aliases"))
+            self.total_size = conn.execute(select(func.coalesce(func.sum(CacheEntry.size), 0))).scalar()
+    
+    @staticmethod
+    def __set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+    
+    def get_many(self, hashes: list, touch: bool = True):
+        """Retrieves the cached embeddings of the given hashes and marks them as recently used.
+        
+        Args:
+            hashes (list): The content hashes to look up.
+            touch (bool): When False, the entries are only read and `touch` is left to the caller.
+        
+        Returns:
+            dict: The embeddings found, by hash."""
+        hashes = list(set(hashes))
+        embeddings = {}
+        with self.engine.connect() as conn:
+            for i in range(0, len(hashes), 500):
+                chunk = hashes[i:i + 500]
+                for hash, blob in conn.execute(select(CacheEntry.hash, CacheEntry.embedding).where(CacheEntry.hash.in_(chunk))):
+                    embeddings[hash] = decode_vector(blob)
+        if touch:
+            self.touch(list(embeddings))
+        return embeddings
+    
+    def touch(self, hashes: list):
+        """Marks the entries of the given hashes as recently used.
+        
+        Args:
+            hashes (list): The content hashes of the entries."""
+        now = time.time()
+        with self.engine.begin() as conn:
+            for i in range(0, len(hashes), 500):
+                conn.execute(update(CacheEntry).where(CacheEntry.hash.in_(hashes[i:i + 500])).values(lastUsed=now))
+    
+    def put_many(self, entries: list):
+        """Stores embeddings in the cache, then evicts the least recently used entries if the cache is over its size limit.
+        
+        Args:
+            entries (list): A list of (hash, embedding) tuples."""
+        if not entries:
+            return
+        values = []
+        for hash, embedding in entries:
+            blob = encode_vector(embedding)
+            values.append({"hash": hash, "embedding": blob, "size": len(blob), "lastUsed": time.time()})
+        stmt = insert(CacheEntry).on_conflict_do_nothing(index_elements=[CacheEntry.hash])
+        with self.engine.begin() as conn:
+            inserted = conn.execute(stmt, values).rowcount
+        if inserted == len(values):
+            self.total_size += sum(value["size"] for value in values)
+        else:
+            self.total_size = self.__stored_size()
+        if self.total_size > self.max_bytes:
+            self.evict()
+    
+    def save_drained(self, drained: list):
+        """Applies the writes buffered by the `EmbeddingCacheOverlay` of worker processes, in one pass.
+        
+        Args:
+            drained (list): The (entries, used hashes) tuples returned by `EmbeddingCacheOverlay.drain`."""
+        entries, used = {}, set()
+        for written, touched in drained:
+            entries.update(written)
+            used.update(touched)
+        self.touch(list(used))
+        self.put_many(list(entries.items()))
+    
+    def evict(self):
+        """Deletes the least recently used entries until the cache fits in `max_bytes`."""
+        to_free = self.__stored_size() - self.max_bytes
+        if to_free <= 0:
+            return
+        victims = []
+        with self.engine.begin() as conn:
+            for hash, size in conn.execute(select(CacheEntry.hash, CacheEntry.size).order_by(CacheEntry.lastUsed)):
+                victims.append(hash)
+                to_free -= size
+                if to_free <= 0:
+                    break
+            for i in range(0, len(victims), 500):
+                conn.execute(delete(CacheEntry).where(CacheEntry.hash.in_(victims[i:i + 500])))
+        self.total_size = self.__stored_size()
+    
+    def __stored_size(self):
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.coalesce(func.sum(CacheEntry.size), 0))).scalar()
+    
+    def reset_connections(self):
+        """Drops the pooled connections inherited from the parent process without closing them, so a forked process opens its own."""
+        self.engine.dispose(close=False)
+    
+    def clean(self):
+        """Disposes of the engine and removes the cache database file."""
+        self.engine.dispose()
+        os.remove(self.db_path)
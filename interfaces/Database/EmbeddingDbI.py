@@ -1,5 +1,19 @@
+import hashlib
+
 from abc import ABC, abstractmethod
 
+def model_tag(model_ids: tuple) -> str:
+    """Computes a short identifier of the models producing the embeddings, so that a storage never serves the embeddings of other models.
+    
+    Args:
+        model_ids (tuple): The identifiers of the models, see `CodeT5.model_ids`.
+    
+    Returns:
+        str: The first 12 hexadecimal digits of the sha256 of the model ids, or an empty string when there are none."""
+    if not model_ids:
+        return ""
+    return hashlib.sha256("\0".join(str(model_id) for model_id in model_ids).encode("utf-8")).hexdigest()[:12]
+
 class EmbeddingDbI(ABC):
     
     @abstractmethod
@@ -12,4 +26,50 @@ class EmbeddingDbI(ABC):
     
     @abstractmethod
     def clean(self):
-        raise NotImplementedError()
\ No newline at end of file
+        raise NotImplementedError()
+    
+    def get_embedding_matrix(self, keys : list):
+        """Loads the embeddings of several functions at once as one float32 matrix.
+        
+        Args:
+            keys (list): A list of (file_path, function_name) tuples.
+        
+        Returns:
+            tuple[list, np.ndarray]: The keys that have an embedding, in the same order as `keys`, and the matrix of their embeddings, one row per key."""
+        raise NotImplementedError()
+    
+    def open_repository(self, repoName : str, model_ids : tuple = ()):
+        """Selects the repository whose embeddings are read and written, and the models producing them (see `model_tag`).
+        Storages shared by every repository ignore the repository, and storages of a single kind of embedding ignore the models."""
+        pass
+    
+    def reset_connections(self):
+        """Drops the database connections inherited from a parent process, in a process created with fork. Storages without pooled connections ignore it."""
+        pass
+    
+    def flush(self):
+        """Makes the embeddings saved so far durable. Storages that write through ignore it."""
+        pass
+    
+    def save_many(self, rows : list):
+        """Saves several embeddings at once.
+        
+        Args:
+            rows (list): A list of (file_path, function_name, embedding) tuples."""
+        for file_path, function_name, embedding in rows:
+            self.save_embedding(file_path=file_path, embedding=embedding, function_name=function_name)
+    
+    def get_many(self, keys : list):
+        """Retrieves several embeddings at once.
+        
+        Args:
+            keys (list): A list of (file_path, function_name) tuples.
+        
+        Returns:
+            dict: The embeddings found, by (file_path, function_name)."""
+        embeddings = {}
+        for file_path, function_name in keys:
+            embedding = self.get_embedding(file_path, function_name)
+            if embedding is not None:
+                embeddings[(file_path, function_name)] = embedding
+        return embeddings
\ No newline at end of file
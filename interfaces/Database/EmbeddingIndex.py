@@ -0,0 +1,178 @@
+import os
+import shutil
+import numpy as np
+
+from interfaces.Database.EmbeddingDbI import EmbeddingDbI, model_tag
+from utils.vectors import to_float32
+
+class EmbeddingIndex(EmbeddingDbI):
+    """Persistent per-repository embedding index.
+    
+    The embeddings of a repository are stored in `<root>/<repoName>/<model tag>/vectors.npy`, a float32 matrix opened with a memory map,
+    and `<root>/<repoName>/<model tag>/keys.tsv`, an append-only sidecar where line i holds the file path and function name of row i.
+    The embeddings of different models (a different precision for instance) are kept in different directories, see `model_tag`.
+    Opening an index only maps the matrix, so the pages are loaded on demand and shared between every process reading the same repository.
+    The matrix is allocated with spare rows: updating a function patches its row in place and new functions are appended to the free rows."""
+    
+    def __init__(self, root: str = None, initial_capacity: int = 1024) -> None:
+        self.root = root or os.getenv("EMBEDDING_INDEX_PATH", "./embeddings")
+        self.initial_capacity = initial_capacity
+        self.path = None
+        self.vectors = None
+        self.rows = None
+        self.keys = None
+    
+    def open_repository(self, repoName, model_ids = ()):
+        """Opens the index of the given repository and models, creating its directory if needed.
+        
+        Args:
+            repoName (str): The name of the repository.
+            model_ids (tuple): The identifiers of the models producing the embeddings."""
+        self.path = os.path.join(self.root, repoName, model_tag(model_ids))
+        os.makedirs(self.path, exist_ok=True)
+        self.vectors_path = os.path.join(self.path, "vectors.npy")
+        self.keys_path = os.path.join(self.path, "keys.tsv")
+        self.vectors = np.load(self.vectors_path, mmap_mode="r+") if os.path.exists(self.vectors_path) else None
+        if self.vectors is None and os.path.exists(self.keys_path):
+            # Keys left without their matrix by an interrupted first save: their rows would be read as zeros once a matrix is allocated
+            os.remove(self.keys_path)
+        self.rows = None
+        self.keys = None
+    
+    def __load_keys(self):
+        """Reads the sidecar lazily, the first time a lookup needs it."""
+        if self.rows is not None:
+            return
+        self.rows, self.keys = {}, []
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, encoding="utf-8") as f:
+                for line in f:
+                    file_path, function_name = line.rstrip("\n").split("\t")
+                    self.rows[(file_path, function_name)] = len(self.keys)
+                    self.keys.append((file_path, function_name))
+    
+    def __reserve(self, count, dim):
+        """Makes sure the matrix has at least `count` rows of size `dim`, doubling its capacity when needed.
+        
+        The grown matrix is written to a temporary file and swapped in with an atomic rename, so readers keep a valid mapping of the previous file."""
+        if self.vectors is not None and self.vectors.shape[0] >= count:
+            return
+        capacity = max(self.initial_capacity, count)
+        if self.vectors is not None:
+            capacity = max(capacity, 2 * self.vectors.shape[0])
+        tmp_path = self.vectors_path + ".tmp"
+        grown = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(capacity, dim))
+        if self.vectors is not None:
+            grown[:self.vectors.shape[0]] = self.vectors
+        grown.flush()
+        del grown
+        os.replace(tmp_path, self.vectors_path)
+        self.vectors = np.load(self.vectors_path, mmap_mode="r+")
+    
+    def get_embedding(self, file_path, function_name = None):
+        """Retrieves the embedding of a function.
+        
+        Args:
+            file_path (str): The file path associated with the embedding.
+            function_name (str): The name of the function associated with the embedding.
+        
+        Returns:
+            np.ndarray or None: A view on the row of the embedding if found, otherwise None."""
+        self.__load_keys()
+        row = self.rows.get((file_path, function_name))
+        if row is None or self.vectors is None:
+            return None
+        return self.vectors[row]
+    
+    def get_embedding_matrix(self, keys):
+        """Gathers the embeddings of the given functions into one contiguous float32 matrix.
+        
+        Args:
+            keys (list): A list of (file_path, function_name) tuples.
+        
+        Returns:
+            tuple[list, np.ndarray]: The keys that have an embedding and the matrix of their embeddings, one row per key."""
+        self.__load_keys()
+        found_keys, rows = [], []
+        for key in keys:
+            row = self.rows.get(key)
+            if row is not None:
+                found_keys.append(key)
+                rows.append(row)
+        if self.vectors is None:
+            return [], np.empty((0, 0), dtype=np.float32)
+        return found_keys, self.vectors[np.asarray(rows, dtype=np.intp)]
+    
+    def save_embedding(self, file_path, function_name, embedding):
+        """Saves the embedding of a function.
+        
+        An existing row is overwritten in place. A new function takes the next free row and its key is appended to the sidecar.
+        
+        Args:
+            file_path (str): The file path associated with the embedding.
+            function_name (str): The name of the function associated with the embedding.
+            embedding (torch.Tensor | np.ndarray): The embedding to save."""
+        self.__load_keys()
+        vector = to_float32(embedding)
+        key = (file_path, function_name)
+        row = self.rows.get(key)
+        if row is None:
+            row = len(self.keys)
+            self.__reserve(row + 1, vector.shape[0])
+            self.vectors[row] = vector
+            with open(self.keys_path, "a", encoding="utf-8") as f:
+                f.write(f"{file_path}\t{function_name}\n")
+            self.rows[key] = row
+            self.keys.append(key)
+        else:
+            self.vectors[row] = vector
+    
+    def save_many(self, rows):
+        """Saves several embeddings at once, growing the matrix and appending to the sidecar only once.
+        
+        Args:
+            rows (list): A list of (file_path, function_name, embedding) tuples."""
+        if not rows:
+            return
+        self.__load_keys()
+        vectors = [to_float32(embedding) for _, _, embedding in rows]
+        new_keys = []
+        for (file_path, function_name, _), vector in zip(rows, vectors):
+            key = (file_path, function_name)
+            if key not in self.rows:
+                self.rows[key] = len(self.keys) + len(new_keys)
+                new_keys.append(key)
+        self.__reserve(len(self.keys) + len(new_keys), vectors[0].shape[0])
+        for (file_path, function_name, _), vector in zip(rows, vectors):
+            self.vectors[self.rows[(file_path, function_name)]] = vector
+        if new_keys:
+            with open(self.keys_path, "a", encoding="utf-8") as f:
+                f.writelines(f"{file_path}\t{function_name}\n" for file_path, function_name in new_keys)
+            self.keys.extend(new_keys)
+    
+    def get_many(self, keys):
+        """Retrieves several embeddings at once.
+        
+        Args:
+            keys (list): A list of (file_path, function_name) tuples.
+        
+        Returns:
+            dict: Views on the rows of the embeddings found, by (file_path, function_name)."""
+        self.__load_keys()
+        if self.vectors is None:
+            return {}
+        return {key: self.vectors[self.rows[key]] for key in keys if key in self.rows}
+    
+    def flush(self):
+        """Writes the modified pages of the matrix back to disk."""
+        if self.vectors is not None:
+            self.vectors.flush()
+    
+    def clean(self):
+        """Closes the index and removes the files of the current repository, or of every repository when none is open."""
+        self.vectors = None
+        self.rows = None
+        self.keys = None
+        path = self.path if self.path is not None else self.root
+        if os.path.exists(path):
+            shutil.rmtree(path)
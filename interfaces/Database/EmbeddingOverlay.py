@@ -0,0 +1,124 @@
+from interfaces.Database.EmbeddingDbI import EmbeddingDbI
+from utils.vectors import stack_float32, to_float32
+
+class EmbeddingOverlay(EmbeddingDbI):
+    """Write buffer in front of an embedding storage, used by the worker processes of the parallel semantic test.
+    
+    The wrapped storage is only read, so every worker sees the same snapshot of it while the run lasts. The embeddings written
+    by the worker are kept in memory, take precedence over the wrapped storage, and are handed to the writer process with `drain`.
+    
+    The overlay is created in the worker after the fork: the pooled connections inherited from the parent are dropped with `reset_connections`."""
+    
+    def __init__(self, base: EmbeddingDbI) -> None:
+        self.base = base
+        self.base.reset_connections()
+        self.written = {}
+        self.pending = []
+    
+    def save_embedding(self, file_path, embedding, function_name = None):
+        self.save_many([(file_path, function_name, embedding)])
+    
+    def get_embedding(self, file_path, function_name = None):
+        key = (file_path, function_name)
+        if key in self.written:
+            return self.written[key]
+        return self.base.get_embedding(file_path, function_name)
+    
+    def save_many(self, rows):
+        """Buffers several embeddings.
+        
+        Args:
+            rows (list): A list of (file_path, function_name, embedding) tuples."""
+        for file_path, function_name, embedding in rows:
+            if not isinstance(embedding, str):
+                embedding = to_float32(embedding)
+            self.written[(file_path, function_name)] = embedding
+            self.pending.append((file_path, function_name, embedding))
+    
+    def get_many(self, keys):
+        """Retrieves several embeddings, from the buffer first and from the wrapped storage for the others.
+        
+        Args:
+            keys (list): A list of (file_path, function_name) tuples.
+        
+        Returns:
+            dict: The embeddings found, by (file_path, function_name)."""
+        embeddings = self.base.get_many([key for key in keys if key not in self.written])
+        embeddings.update({key: self.written[key] for key in keys if key in self.written})
+        return embeddings
+    
+    def get_embedding_matrix(self, keys):
+        """Gathers the embeddings of the given functions into one contiguous float32 matrix, the buffered ones replacing the stored ones.
+        
+        Args:
+            keys (list): A list of (file_path, function_name) tuples.
+        
+        Returns:
+            tuple[list, np.ndarray]: The keys that have an embedding and the matrix of their embeddings, one row per key."""
+        if not any(key in self.written for key in keys):
+            return self.base.get_embedding_matrix(keys)
+        stored_keys, stored = self.base.get_embedding_matrix([key for key in keys if key not in self.written])
+        rows = dict(zip(stored_keys, stored))
+        rows.update({key: self.written[key] for key in keys if key in self.written})
+        found_keys = [key for key in keys if key in rows]
+        return found_keys, stack_float32([rows[key] for key in found_keys])
+    
+    def drain(self):
+        """Returns the embeddings written since the previous call, for the writer process to save them.
+        
+        Returns:
+            list: A list of (file_path, function_name, embedding) tuples."""
+        pending, self.pending = self.pending, []
+        return pending
+    
+    def clean(self):
+        """Forgets the buffered embeddings, the wrapped storage is left untouched."""
+        self.written = {}
+        self.pending = []
+
+class EmbeddingCacheOverlay:
+    """Write buffer in front of an `EmbeddingCache`, used by the worker processes of the parallel semantic test.
+    
+    Like `EmbeddingOverlay`, the cache is only read by the worker: the new entries and the hashes of the entries used are kept in memory
+    and handed to the writer process with `drain`, which applies them with `EmbeddingCache.save_drained`.
+    
+    The overlay is created in the worker after the fork: the pooled connections inherited from the parent are dropped with `reset_connections`."""
+    
+    def __init__(self, base) -> None:
+        self.base = base
+        self.base.reset_connections()
+        self.written = {}
+        self.pending = []
+        self.used = set()
+    
+    def get_many(self, hashes: list):
+        """Retrieves embeddings, from the buffer first and from the wrapped cache for the others.
+        
+        Args:
+            hashes (list): The content hashes to look up.
+        
+        Returns:
+            dict: The embeddings found, by hash."""
+        embeddings = self.base.get_many([hash for hash in hashes if hash not in self.written], touch=False)
+        self.used.update(embeddings)
+        embeddings.update({hash: self.written[hash] for hash in hashes if hash in self.written})
+        return embeddings
+    
+    def put_many(self, entries: list):
+        """Buffers new cache entries.
+        
+        Args:
+            entries (list): A list of (hash, embedding) tuples."""
+        for hash, embedding in entries:
+            embedding = to_float32(embedding)
+            self.written[hash] = embedding
+            self.pending.append((hash, embedding))
+    
+    def drain(self):
+        """Returns the entries written and the hashes used since the previous call, for the writer process to save them.
+        
+        Returns:
+            tuple[list, list]: The (hash, embedding) tuples of the new entries and the hashes of the entries used."""
+        drained = (self.pending, list(self.used))
+        self.pending, self.used = [], set()
+        return drained
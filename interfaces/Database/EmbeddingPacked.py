@@ -0,0 +1,169 @@
+import logging
+import os
+
+from interfaces.Database.EmbeddingDbI import EmbeddingDbI, model_tag
+from utils.vectors import encode_vector, decode_vector, stack_float32
+from sqlalchemy import Column, Integer, String, BLOB, UniqueConstraint, create_engine, delete, event, select, tuple_
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.declarative import declarative_base
+
+Base = declarative_base()
+
+class Embeddings3(Base):
+    __tablename__ = 'embeddings'
+    __table_args__ = (UniqueConstraint('file_path', 'function_name', name='ux_embeddings_file_function'),)
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    file_path = Column(String, nullable=False)
+    function_name = Column(String, nullable=False, default="")
+    embedding = Column(BLOB)
+
+class StoreInfo(Base):
+    __tablename__ = 'storeInfo'
+    
+    key = Column(String, primary_key=True)
+    value = Column(String)
+
+class EmbeddingPacked(EmbeddingDbI):
+    """Embedding storage for CodeT5 with a unique (file_path, function_name) index, native UPSERT and batched reads and writes.
+    
+    The embeddings are stored with `utils.vectors.encode_vector` as raw little-endian float32 bytes behind a dtype and dimension header, so no pickle round-trip is needed.
+    Every write is committed in its own transaction.
+    The storage holds the embeddings of a single set of models: they are all deleted when it is opened for other models (see `open_repository`)."""
+    
+    db_path = './Embeddings3.db'
+    chunk_size = 400
+    
+    def __init__(self, db_path: str = None) -> None:
+        self.db_path = db_path or self.db_path
+        self.engine = create_engine('sqlite:///' + self.db_path)
+        event.listen(self.engine, "connect", self.__set_pragmas)
+        Base.metadata.create_all(self.engine)
+    
+    @staticmethod
+    def __set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+    
+    def open_repository(self, repoName, model_ids = ()):
+        """Checks that the stored embeddings were produced by the given models, and deletes them otherwise.
+        
+        Args:
+            repoName (str): The name of the repository, ignored since the storage is shared by every repository.
+            model_ids (tuple): The identifiers of the models producing the embeddings."""
+        tag = model_tag(model_ids)
+        if not tag:
+            return
+        with self.engine.begin() as conn:
+            stored = conn.execute(select(StoreInfo.value).where(StoreInfo.key == "models")).scalar()
+            if stored == tag:
+                return
+            deleted = conn.execute(delete(Embeddings3)).rowcount
+            if deleted:
+                logging.warning(f"{deleted} embeddings of other models deleted from {self.db_path}")
+            stmt = insert(StoreInfo).values(key="models", value=tag)
+            conn.execute(stmt.on_conflict_do_update(index_elements=[StoreInfo.key], set_={"value": tag}))
+    
+    def get_embedding(self, file_path, function_name):
+        """Retrieves the embedding of a function.
+        
+        Args:
+            file_path (str): The file path associated with the embedding.
+            function_name (str): The name of the function associated with the embedding.
+        
+        Returns:
+            np.ndarray or None: The embedding if found, otherwise None."""
+        return self.get_many([(file_path, function_name)]).get((file_path, function_name))
+    
+    def save_embedding(self, file_path, function_name, embedding):
+        """Saves the embedding of a function, replacing the previous one if any.
+        
+        Args:
+            file_path (str): The file path associated with the embedding.
+            function_name (str): The name of the function associated with the embedding.
+            embedding (torch.Tensor | np.ndarray): The embedding to save."""
+        self.save_many([(file_path, function_name, embedding)])
+    
+    def save_many(self, rows):
+        """Saves several embeddings with one UPSERT statement executed in a single transaction.
+        
+        Args:
+            rows (list): A list of (file_path, function_name, embedding) tuples."""
+        if not rows:
+            return
+        stmt = insert(Embeddings3)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Embeddings3.file_path, Embeddings3.function_name],
+            set_={"embedding": stmt.excluded.embedding}
+        )
+        values = [
+            {"file_path": file_path, "function_name": function_name or "", "embedding": encode_vector(embedding)}
+            for file_path, function_name, embedding in rows
+        ]
+        with self.engine.begin() as conn:
+            conn.execute(stmt, values)
+    
+    def get_many(self, keys):
+        """Retrieves several embeddings with one indexed query per chunk of keys.
+        
+        Args:
+            keys (list): A list of (file_path, function_name) tuples.
+        
+        Returns:
+            dict: The embeddings found, by (file_path, function_name)."""
+        keys = [(file_path, function_name or "") for file_path, function_name in keys]
+        embeddings = {}
+        with self.engine.connect() as conn:
+            for i in range(0, len(keys), self.chunk_size):
+                stmt = select(Embeddings3.file_path, Embeddings3.function_name, Embeddings3.embedding).where(
+                    tuple_(Embeddings3.file_path, Embeddings3.function_name).in_(keys[i:i + self.chunk_size])
+                )
+                for file_path, function_name, blob in conn.execute(stmt):
+                    embeddings[(file_path, function_name)] = decode_vector(blob)
+        return embeddings
+    
+    def get_embedding_matrix(self, keys):
+        """Gathers the embeddings of the given functions into one contiguous float32 matrix.
+        
+        Args:
+            keys (list): A list of (file_path, function_name) tuples.
+        
+        Returns:
+            tuple[list, np.ndarray]: The keys that have an embedding and the matrix of their embeddings, one row per key."""
+        embeddings = self.get_many(keys)
+        found_keys = [key for key in keys if key in embeddings]
+        return found_keys, stack_float32([embeddings[key] for key in found_keys])
+    
+    def reset_connections(self):
+        """Drops the pooled connections inherited from the parent process without closing them, so a forked process opens its own."""
+        self.engine.dispose(close=False)
+    
+    def clean(self):
+        """Disposes of the engine and removes the SQLite database file."""
+        self.engine.dispose()
+        os.remove(self.db_path)
+
+class EmbeddingPackedAlg(EmbeddingPacked):
+    """Packed storage for the texts cached by Algorithmic, keyed by file path only."""
+    
+    db_path = './Embeddings4.db'
+    
+    def get_embedding(self, file_path, function_name = None):
+        """Retrieves the cached text of a file.
+        
+        Args:
+            file_path (str): The file path associated with the text.
+        
+        Returns:
+            str or None: The text if found, otherwise None."""
+        return super().get_embedding(file_path, "")
+    
+    def save_embedding(self, file_path, embedding, function_name = None):
+        """Saves the text of a file, replacing the previous one if any.
+        
+        Args:
+            file_path (str): The file path associated with the text.
+            embedding (str): The text to save."""
+        super().save_embedding(file_path, "", embedding)
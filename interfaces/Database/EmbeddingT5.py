@@ -2,6 +2,7 @@ import pickle
 import os
 
 from interfaces.Database.EmbeddingDbI import EmbeddingDbI
+from utils.vectors import stack_float32
 from sqlalchemy import Column, Integer, String, BLOB, create_engine, select, insert, update
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -17,9 +18,9 @@ class Embeddings1(Base):
 
 class EmbeddingT5(EmbeddingDbI):
     def __init__(self) -> None:
-        engine = create_engine('sqlite:///Embeddings1.db')
-        Base.metadata.create_all(engine)
-        self.conn = engine.connect()
+        self.engine = create_engine('sqlite:///Embeddings1.db')
+        Base.metadata.create_all(self.engine)
+        self.conn = self.engine.connect()
     
     def get_embedding(self, file_path, function_name):
         """Retrieves an embedding from the database for the given file path and function name.
@@ -38,6 +39,27 @@ class EmbeddingT5(EmbeddingDbI):
             return pickle.loads(row[0])
         return None
     
+    def get_embedding_matrix(self, keys):
+        """Loads the embeddings of the given functions as one contiguous float32 matrix.
+        
+        All the embeddings are fetched with a single query, then the rows are kept in the order of `keys`.
+        
+        Args:
+            keys (list): A list of (file_path, function_name) tuples.
+        
+        Returns:
+            tuple[list, np.ndarray]: The keys that have an embedding and the matrix of their embeddings, one row per key."""
+        stmt = select(Embeddings1.file_path, Embeddings1.function_name, Embeddings1.embedding)
+        stored = {(row[0], row[1]): row[2] for row in self.conn.execute(stmt)}
+        self.conn.commit()
+        
+        found_keys, embeddings = [], []
+        for key in keys:
+            if key in stored:
+                found_keys.append(key)
+                embeddings.append(pickle.loads(stored[key]))
+        return found_keys, stack_float32(embeddings)
+    
     def save_embedding(self, file_path, function_name, embedding):
         """Saves an embedding to the database.
         
@@ -57,6 +79,23 @@ class EmbeddingT5(EmbeddingDbI):
         else:
             self.conn.execute(old)
     
+    def save_many(self, rows):
+        """Saves several embeddings at once.
+        
+        Args:
+            rows (list): A list of (file_path, function_name, embedding) tuples."""
+        for file_path, function_name, embedding in rows:
+            self.save_embedding(file_path, function_name, embedding)
+    
+    def flush(self):
+        """Commits the embeddings saved on the connection."""
+        self.conn.commit()
+    
+    def reset_connections(self):
+        """Drops the connection inherited from the parent process without closing it, and opens a new one for the forked process."""
+        self.engine.dispose(close=False)
+        self.conn = self.engine.connect()
+    
     def clean(self):
         """Closes the database connection and removes the SQLite database file.
         
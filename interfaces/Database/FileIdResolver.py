@@ -0,0 +1,69 @@
+from models.gitFile import GitFile
+from utils.missingFileException import MissingFileException
+
+class FileIdResolver:
+    """In-memory mapping from file path to GitFile id for one repository.
+    
+    The mapping is loaded with a single query on first use, then every lookup is a dictionary hit.
+    Unknown files are inserted together in one bulk INSERT and added to the mapping, so it stays in sync with the gitFile table."""
+    
+    def __init__(self, db, repoId: int):
+        self.db = db
+        self.repoId = repoId
+        self.ids = None
+    
+    def __load(self):
+        if self.ids is None:
+            self.ids = self.db.get_file_ids(self.repoId)
+    
+    def __contains__(self, fileName: str):
+        self.__load()
+        return fileName in self.ids
+    
+    def get(self, fileName: str):
+        """Retrieves the id of a file.
+        
+        Parameters:
+            fileName (str): The path of the file in the repository.
+        
+        Returns:
+            int: The database ID of the file.
+        
+        Raises:
+            MissingFileException: If the file is not in the db."""
+        self.__load()
+        fileId = self.ids.get(fileName)
+        if fileId is None:
+            raise MissingFileException(fileName)
+        return fileId
+    
+    def resolve_many(self, files):
+        """Retrieves the ids of several files, inserting the missing ones in bulk.
+        
+        Parameters:
+            files (Iterable[tuple[str, str]]): (file path, blob sha) tuples.
+        
+        Returns:
+            dict[str, int]: The database ID of every file, by file path."""
+        self.__load()
+        files = list(files)
+        missing = {}
+        for fileName, sha in files:
+            if fileName not in self.ids and fileName not in missing:
+                missing[fileName] = GitFile(sha = sha, fileName = fileName, repositoryId = self.repoId)
+        if missing:
+            self.ids.update(self.db.insert_gitFiles(list(missing.values())))
+        return {fileName: self.ids[fileName] for fileName, _ in files}
+    
+    def add_missing(self, gitFiles, batch_size: int = 1000):
+        """Streams GitFile objects into the db, skipping the files already known, in batches of `batch_size`.
+        
+        Parameters:
+            gitFiles (Iterable[GitFile]): The files to add."""
+        batch = []
+        for gitFile in gitFiles:
+            batch.append((gitFile.fileName, gitFile.sha))
+            if len(batch) >= batch_size:
+                self.resolve_many(batch)
+                batch = []
+        self.resolve_many(batch)
@@ -1,6 +1,9 @@
 from __future__ import annotations
 import logging
+import os
+from contextlib import contextmanager
 from interfaces.Database.DbInterface import DbInterface
+from models.db import Base
 from models.repository import Repository
 from models.issue import Issue
 from models.pullRequest import PullRequest
@@ -8,14 +11,59 @@ from models.modifiedFiles import ModifiedFiles
 from models.gitFile import GitFile
 from models.comment import Comment
 from models.testResult import TestResult
-from sqlalchemy import update, select, func
+from models.testResultRank import TestResultRank
+from models.syncState import SyncState
+from sqlalchemy import insert, update, select, func, text
+from sqlalchemy.dialects import sqlite
 from typing import List
 from utils.missingFileException import MissingFileException
 
 class SQLite(DbInterface):
     
-    def __init__(self, session):
+    def __init__(self, session, batch_size: int = None):
         self.session = session
+        self.batch_size = batch_size or int(os.getenv("SQLITE_BATCH_SIZE", 1))
+        self.depth = 0
+        self.pending = 0
+    
+    def __commit(self):
+        """Commits the session, unless the write is part of a transaction opened with `transaction`, in which case the rows are only flushed."""
+        if self.depth > 0:
+            self.session.flush()
+        else:
+            self.session.commit()
+    
+    @contextmanager
+    def transaction(self):
+        """Groups the writes made in the block into one unit that is committed at once.
+        
+        Inside the block, `insert`, `insert_many` and the other writes only flush their rows. When the outermost block exits,
+        the unit is committed, or kept pending until `batch_size` units are complete (see `commit_pending`).
+        If the block raises, every pending unit is rolled back.
+        
+        Usage:
+            with sqlite.transaction():
+                sqlite.insert(pullItem)
+                sqlite.insert_many(comments)"""
+        self.depth += 1
+        try:
+            yield self
+        except BaseException:
+            self.depth -= 1
+            if self.depth == 0:
+                self.session.rollback()
+                self.pending = 0
+            raise
+        self.depth -= 1
+        if self.depth == 0:
+            self.pending += 1
+            if self.pending >= self.batch_size:
+                self.commit_pending()
+    
+    def commit_pending(self):
+        """Commits the units kept pending by `transaction`."""
+        self.session.commit()
+        self.pending = 0
     
     def insert(self, data: Repository | Issue | PullRequest | TestResult | GitFile):
         """Inserts the given data object into the database.
@@ -23,26 +71,72 @@ class SQLite(DbInterface):
         Parameters:
             data (Repository | Issue | PullRequest | ModifiedFiles | Comment): The data object to insert.
         
-        Commits the change to the database."""
+        Commits the change to the database, or flushes it inside a `transaction`."""
     
         self.session.add(data)
-        self.session.commit()
+        self.__commit()
         return data.id
     
     def insert_many(self, data: List[ModifiedFiles | Comment | GitFile]):
         """Inserts the given list of data objects into the database.
         
+        ModifiedFiles rows have no generated id, so they are written with a single Core executemany INSERT instead of an ORM unit of work.
+        
         Parameters:
             data (list[Repository | Issue | PullRequest | ModifiedFiles | Comment]): 
                 The list of data objects to insert.
         
-        Commits the changes to the database."""
+        Commits the changes to the database, or flushes them inside a `transaction`."""
     
+        if data and all(isinstance(x, ModifiedFiles) for x in data):
+            self.session.execute(insert(ModifiedFiles), [self.__as_row(x) for x in data])
+            self.__commit()
+            return
         self.session.add_all(data)
-        self.session.commit()
+        self.__commit()
         if not all(isinstance(x, ModifiedFiles) for x in data):
             return [data.id for data in data]
     
+    @staticmethod
+    def __as_row(item):
+        """Converts a model object into the dict of its column values, leaving a missing id to the database."""
+        return {column.key: getattr(item, column.key) for column in type(item).__table__.columns if column.key != "id" or item.id is not None}
+    
+    def insert_test_result(self, issueId: int, ranking: list, full_ranking: bytes = None):
+        """Stores the result of the semantic test of an issue.
+        
+        The top of the ranking is written to the testResultRank table, one row per file, with a single executemany INSERT.
+        The full ranking, packed with `utils.rankings.encode_ranking`, can be kept in the `ranking` column of the testResult row.
+        
+        Parameters:
+            issueId (int): The ID of the tested issue.
+            ranking (list[tuple[int, float]]): The (gitFileId, score) pairs of the best files, best first.
+            full_ranking (bytes, optional): The packed full ranking.
+        
+        Returns:
+            int: The ID of the testResult row."""
+        testResult = TestResult(issueId = issueId, ranking = full_ranking)
+        self.session.add(testResult)
+        if ranking:
+            rows = [{"issueId": issueId, "rank": rank, "gitFileId": fileId, "score": score} for rank, (fileId, score) in enumerate(ranking, 1)]
+            self.session.execute(insert(TestResultRank), rows)
+        self.__commit()
+        return testResult.id
+    
+    def get_top_files(self, issueId: int, k: int = None):
+        """Retrieves the best ranked files of a tested issue.
+        
+        Parameters:
+            issueId (int): The ID of the tested issue.
+            k (int, optional): The number of files to retrieve. Every stored rank is returned when None.
+        
+        Returns:
+            list[tuple[int, int, float]]: The rank, gitFileId and score of each file, best first."""
+        stmt = select(TestResultRank.rank, TestResultRank.gitFileId, TestResultRank.score).where(TestResultRank.issueId == issueId).order_by(TestResultRank.rank)
+        if k is not None:
+            stmt = stmt.limit(k)
+        return self.session.execute(stmt).fetchall()
+    
     def update_issueId_pullRequest(self, pullId: int, issueId: int):
         """Updates the issueId field of a PullRequest in the database.
     
@@ -80,6 +174,23 @@ class SQLite(DbInterface):
         stmt = select(Issue.title, Issue.body, PullRequest.shaBase, Issue.id).where(PullRequest.issueId == Issue.id).where(Issue.repositoryId == self.get_repoId_from_repoName(repositoryName))
         return(self.session.execute(stmt).fetchall())
     
+    def get_pending_issues(self, repositoryName: str):
+        """Retrieves, with one query, the issues of a repository that have no test result yet.
+        
+        Parameters:
+            repositoryName (str): The name of the repository to retrieve data for.
+        
+        Returns:
+            list[tuple[str, str, str, int]]: A list of tuples containing the issue title, body, the base SHA of its pull request and the issue ID."""
+        stmt = (
+            select(Issue.title, Issue.body, PullRequest.shaBase, Issue.id)
+            .join(PullRequest, PullRequest.issueId == Issue.id)
+            .outerjoin(TestResult, TestResult.issueId == Issue.id)
+            .where(Issue.repositoryId == self.get_repoId_from_repoName(repositoryName))
+            .where(TestResult.issueId.is_(None))
+        )
+        return(self.session.execute(stmt).fetchall())
+    
     def get_repoId_from_repoName(self, repositoryName: str):
         """Retrieves the database ID of a repository by its full name.
     
@@ -94,4 +205,111 @@ class SQLite(DbInterface):
     def issue_exists(self, issueId: int) -> bool:
         stmt = select(func.count(TestResult.issueId)).where(TestResult.issueId == issueId)
         result = self.session.execute(stmt).scalar()
-        return result > 0
\ No newline at end of file
+        return result > 0
+    
+    def repository_exists(self, repoId: int) -> bool:
+        """Checks whether a repository is already stored.
+        
+        Parameters:
+            repoId (int): The GitHub ID of the repository."""
+        return self.session.get(Repository, repoId) is not None
+    
+    def get_file_ids(self, repoId: int):
+        """Retrieves the ids of all the files of a repository with one query.
+        
+        Parameters:
+            repoId (int): The ID of the repository.
+        
+        Returns:
+            dict[str, int]: The database ID of each file, by file name."""
+        stmt = select(GitFile.fileName, GitFile.id).where(GitFile.repositoryId == repoId)
+        return {fileName: fileId for fileName, fileId in self.session.execute(stmt)}
+    
+    def insert_gitFiles(self, gitFiles: List[GitFile]):
+        """Inserts GitFile rows with one executemany INSERT ... RETURNING.
+        
+        Parameters:
+            gitFiles (list[GitFile]): The files to insert.
+        
+        Returns:
+            dict[str, int]: The database ID of each inserted file, by file name."""
+        if not gitFiles:
+            return {}
+        stmt = insert(GitFile).returning(GitFile.fileName, GitFile.id)
+        rows = self.session.execute(stmt, [self.__as_row(gitFile) for gitFile in gitFiles]).all()
+        self.__commit()
+        return {fileName: fileId for fileName, fileId in rows}
+    
+    def get_ingested_pulls(self, repoId: int):
+        """Retrieves the pull requests already stored for a repository, with the issue they are linked to.
+        
+        Parameters:
+            repoId (int): The ID of the repository.
+        
+        Returns:
+            dict[int, tuple[int, int]]: The (pull request ID, issue ID) in the db, by pull request GitHub ID."""
+        stmt = select(PullRequest.githubId, PullRequest.id, PullRequest.issueId).join(Issue, PullRequest.issueId == Issue.id).where(Issue.repositoryId == repoId)
+        return {githubId: (pullId, issueId) for githubId, pullId, issueId in self.session.execute(stmt)}
+    
+    def get_comment_ids(self, issueId: int):
+        """Retrieves the GitHub IDs of the comments already stored for an issue.
+        
+        Parameters:
+            issueId (int): The ID of the issue in the db.
+        
+        Returns:
+            set[int]: The GitHub IDs of the comments."""
+        stmt = select(Comment.githubId).where(Comment.issueId == issueId)
+        return set(self.session.execute(stmt).scalars())
+    
+    def get_sync_state(self, repoId: int):
+        """Retrieves the checkpoint of the last synchronisation of a repository.
+        
+        Parameters:
+            repoId (int): The ID of the repository.
+        
+        Returns:
+            SyncState or None: The checkpoint, if the repository was already synchronised."""
+        return self.session.get(SyncState, repoId)
+    
+    def save_sync_state(self, repoId: int, lastUpdatedAt, lastPullGithubId: int):
+        """Moves the checkpoint of a repository forward and commits it, or adds it to the current `transaction`.
+        
+        Parameters:
+            repoId (int): The ID of the repository.
+            lastUpdatedAt (datetime): The update time of the last pull request ingested.
+            lastPullGithubId (int): The GitHub ID of the last pull request ingested."""
+        self.session.merge(SyncState(repositoryId = repoId, lastUpdatedAt = lastUpdatedAt, lastPullGithubId = lastPullGithubId))
+        self.__commit()
+    
+    def get_table_sizes(self):
+        """Counts the rows of every table of the models.
+        
+        Returns:
+            list[tuple[str, int]]: The name and row count of each table."""
+        sizes = []
+        for table in Base.metadata.sorted_tables:
+            sizes.append((table.name, self.session.execute(select(func.count()).select_from(table)).scalar()))
+        return sizes
+    
+    def get_query_plans(self):
+        """Explains how SQLite runs the lookups used by the commands.
+        
+        Returns:
+            list[tuple[str, list[str]]]: The name of each lookup and the lines of its EXPLAIN QUERY PLAN."""
+        queries = [
+            ("file id by name", select(GitFile.id).where(GitFile.fileName == "").where(GitFile.repositoryId == 0)),
+            ("files of a repository", select(GitFile.fileName, GitFile.id).where(GitFile.repositoryId == 0)),
+            ("repository by name", select(Repository.id).where(Repository.fullName == "")),
+            ("pull request by GitHub id", update(PullRequest).where(PullRequest.githubId == 0).values(issueId = 0)),
+            ("issues of a repository", select(Issue.title, Issue.body, PullRequest.shaBase, Issue.id).where(PullRequest.issueId == Issue.id).where(Issue.repositoryId == 0)),
+            ("comments of an issue", select(Comment.githubId).where(Comment.issueId == 0)),
+            ("test result of an issue", select(func.count(TestResult.issueId)).where(TestResult.issueId == 0)),
+            ("top files of an issue", select(TestResultRank.gitFileId, TestResultRank.score).where(TestResultRank.issueId == 0).order_by(TestResultRank.rank).limit(10)),
+        ]
+        plans = []
+        for name, stmt in queries:
+            compiled = stmt.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True})
+            rows = self.session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).fetchall()
+            plans.append((name, [row[-1] for row in rows]))
+        return plans
\ No newline at end of file
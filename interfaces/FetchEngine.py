@@ -0,0 +1,116 @@
+import copy
+import logging
+import os
+import threading
+import time
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from github import GithubException, RateLimitExceededException
+
+class FetchEngine:
+    """Runs GitHub API calls concurrently on a bounded thread pool while pacing them with the rate-limit headers.
+    
+    Before each call the engine reads the remaining budget and the reset time that PyGithub keeps from the `X-RateLimit-*` headers of the last response, calls are not paced while they are unknown.
+    When the remaining budget gets below `slow_down_ratio` of the limit, the calls are spread evenly until the reset, and when it reaches `reserve` they wait for the reset.
+    Calls rejected by a secondary rate limit (403 or 429 with a rate limit message) are retried after the `Retry-After` delay, or with an exponential backoff.
+    
+    PyGithub's connection is not thread-safe, so every thread of the pool uses its own copy of the `Github` client, see `client`."""
+    
+    def __init__(self, g, max_workers: int = None, reserve: int = 50, slow_down_ratio: float = 0.1, max_retries: int = 6):
+        self.g = g
+        self.max_workers = max_workers or int(os.getenv("GITHUB_FETCH_WORKERS", 8))
+        self.reserve = reserve
+        self.slow_down_ratio = slow_down_ratio
+        self.max_retries = max_retries
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.next_call = 0.0
+    
+    def client(self):
+        """Returns the `Github` client of the current thread, a copy of `self.g` made on first use.
+        
+        The copy has its own `Requester`, hence its own connection: two threads sharing a connection could swap their requests."""
+        if getattr(self.local, "g", None) is None:
+            self.local.g = copy.deepcopy(self.g)
+        return self.local.g
+    
+    @staticmethod
+    def __rate_limit(g):
+        """Reads the rate limit that a client's `Requester` kept from the last response, without the API call `Github.rate_limiting` makes when it is unknown.
+        
+        Returns:
+            tuple[int, int, int]: The remaining calls, the limit and the reset time, the limit is -1 when no response carried the rate-limit headers."""
+        requester = g._Github__requester
+        remaining, limit = requester.rate_limiting
+        return remaining, limit, requester.rate_limiting_resettime
+    
+    def __pace(self):
+        """Waits until the rate limit allows one more call.
+        
+        The rate limit of the thread's client is used, or the one of `self.g` before the first response of the thread.
+        When neither is known (responses served by the offline cache for instance), the call is not paced."""
+        with self.lock:
+            remaining, limit, reset = self.__rate_limit(self.client())
+            if limit < 0:
+                remaining, limit, reset = self.__rate_limit(self.g)
+            if limit < 0:
+                return
+            now = time.time()
+            if remaining <= self.reserve:
+                delay = max(reset - now, 0) + 1
+                logging.warning(f"GitHub rate limit almost exhausted ({remaining}/{limit}), waiting {delay:.0f}s for the reset")
+                time.sleep(delay)
+                self.next_call = 0.0
+                return
+            if remaining < limit * self.slow_down_ratio:
+                interval = max(reset - now, 0) / max(remaining - self.reserve, 1)
+                wait = self.next_call - now
+                if wait > 0:
+                    time.sleep(wait)
+                self.next_call = max(now, self.next_call) + interval
+    
+    def call(self, fn, *args):
+        """Calls `fn(*args)` once the rate limit allows it, retrying on secondary rate limits.
+        
+        Returns:
+            The value returned by `fn`."""
+        for attempt in range(self.max_retries + 1):
+            self.__pace()
+            try:
+                return fn(*args)
+            except GithubException as e:
+                if not self.__is_rate_limited(e) or attempt == self.max_retries:
+                    raise
+                retry_after = (e.headers or {}).get("retry-after")
+                delay = int(retry_after) if retry_after else 2 ** attempt * 5
+                logging.warning(f"GitHub secondary rate limit hit, retrying in {delay}s")
+                time.sleep(delay)
+    
+    @staticmethod
+    def __is_rate_limited(e):
+        if isinstance(e, RateLimitExceededException) or e.status == 429:
+            return True
+        return e.status == 403 and "rate limit" in str(e.data).lower()
+    
+    def map(self, fn, items):
+        """Calls `fn` on every item on the thread pool and yields the results in the order of `items`.
+        
+        At most twice the number of workers calls are in flight, so the results can be consumed as they arrive without fetching everything first.
+        
+        Args:
+            fn (callable): The function to call on each item. It should perform all its API requests (iterating paginated lists for instance),
+                through the objects of the thread's client given by `client`.
+            items (iterable): The items to process.
+        
+        Yields:
+            The results of `fn`, in order."""
+        window = self.max_workers * 2
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = deque()
+            for item in items:
+                futures.append(executor.submit(self.call, fn, item))
+                if len(futures) >= window:
+                    yield futures.popleft().result()
+            for future in futures:
+                yield future.result()
@@ -0,0 +1,157 @@
+import os
+import subprocess
+import threading
+
+class WorkTreeReader:
+    """Reads the files currently checked out in a local repository. The `sha` arguments are ignored."""
+    
+    def __init__(self, path: str):
+        self.path = path
+    
+    def list_files(self, sha = None):
+        """Lists the files of the working tree.
+        
+        Returns:
+            list[str]: The paths of the files, relative to the repository root, with '/' separators."""
+        paths = []
+        for root, dirs, files in os.walk(self.path):
+            if ".git" in dirs:
+                dirs.remove(".git")
+            for file in files:
+                paths.append(os.path.relpath(os.path.join(root, file), self.path).replace(os.sep, "/"))
+        return paths
+    
+    def exists(self, sha, file_path: str):
+        return os.path.isfile(os.path.join(self.path, file_path))
+    
+    def read_file(self, sha, file_path: str):
+        """Reads a file of the working tree.
+        
+        Returns:
+            str: The content of the file."""
+        with open(os.path.join(self.path, file_path), "r", encoding="utf-8") as f:
+            return f.read()
+    
+    def close(self):
+        pass
+
+class GitReader:
+    """Reads the files of any commit of a local clone straight from the git object store, without checking it out.
+    
+    Trees are listed with `git ls-tree -r` and blobs are streamed through one persistent `git cat-file --batch` process,
+    so several commits can be read from the same clone while its working tree is left untouched."""
+    
+    def __init__(self, path: str, cached_trees: int = 4):
+        self.path = path
+        self.cached_trees = cached_trees
+        self.trees = {}
+        self.process = None
+        self.lock = threading.Lock()
+    
+    def __git(self, *args):
+        return subprocess.run(["git", *args], cwd=self.path, capture_output=True, check=True).stdout
+    
+    def __tree(self, sha):
+        """Lists the blobs of a commit as a path -> object id dict, keeping the last few listings in memory."""
+        if sha not in self.trees:
+            tree = {}
+            for entry in self.__git("ls-tree", "-r", "-z", sha).split(b"\0"):
+                if not entry:
+                    continue
+                meta, path = entry.split(b"\t", 1)
+                _, kind, oid = meta.split(b" ")
+                if kind == b"blob":
+                    tree[path.decode("utf-8", errors="surrogateescape")] = oid.decode()
+            if len(self.trees) >= self.cached_trees:
+                self.trees.pop(next(iter(self.trees)))
+            self.trees[sha] = tree
+        return self.trees[sha]
+    
+    def list_files(self, sha):
+        """Lists the files of a commit.
+        
+        Args:
+            sha (str): The commit to list.
+        
+        Returns:
+            list[str]: The paths of the files, relative to the repository root."""
+        return list(self.__tree(sha))
+    
+    def list_entries(self, sha):
+        """Lists the files of a commit with their blob SHA.
+        
+        Returns:
+            list[tuple[str, str]]: (path, blob sha) tuples."""
+        return list(self.__tree(sha).items())
+    
+    def exists(self, sha, file_path: str):
+        return file_path in self.__tree(sha)
+    
+    def read_file(self, sha, file_path: str):
+        """Reads a file at a given commit.
+        
+        Args:
+            sha (str): The commit to read the file from.
+            file_path (str): The path of the file, relative to the repository root.
+        
+        Returns:
+            str: The content of the file."""
+        oid = self.__tree(sha).get(file_path)
+        if oid is None:
+            raise FileNotFoundError(f"{file_path} does not exist at {sha}")
+        return self.read_blob(oid).decode("utf-8")
+    
+    def read_blob(self, oid: str):
+        """Reads a blob from the persistent `git cat-file --batch` process.
+        
+        Args:
+            oid (str): The object id of the blob.
+        
+        Returns:
+            bytes: The content of the blob."""
+        with self.lock:
+            if self.process is None or self.process.poll() is not None:
+                self.process = subprocess.Popen(["git", "cat-file", "--batch"], cwd=self.path, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+            self.process.stdin.write(oid.encode() + b"\n")
+            self.process.stdin.flush()
+            header = self.process.stdout.readline().split()
+            if len(header) != 3:
+                raise FileNotFoundError(f"Object {oid} is missing from {self.path}")
+            content = self.process.stdout.read(int(header[2]))
+            self.process.stdout.read(1)
+            return content
+    
+    def commit_times(self, shas):
+        """Reads the committer timestamp of several commits from the persistent `git cat-file --batch` process.
+        
+        Args:
+            shas (iterable[str]): The commits to date.
+        
+        Returns:
+            dict[str, int]: The committer timestamp of each commit found in the clone. Missing commits are left out."""
+        times = {}
+        for sha in shas:
+            try:
+                content = self.read_blob(sha)
+            except FileNotFoundError:
+                continue
+            for line in content.split(b"\n\n", 1)[0].split(b"\n"):
+                if line.startswith(b"committer "):
+                    times[sha] = int(line.rsplit(b" ", 2)[1])
+        return times
+    
+    def changed_files(self, previous_sha, sha):
+        """Lists the files that differ between two commits.
+        
+        Returns:
+            list[str]: The paths of the changed files, relative to the repository root."""
+        output = self.__git("diff", "--name-only", "-z", previous_sha, sha)
+        return [path.decode("utf-8", errors="surrogateescape") for path in output.split(b"\0") if path]
+    
+    def close(self):
+        """Stops the `git cat-file` process."""
+        with self.lock:
+            if self.process is not None:
+                self.process.stdin.close()
+                self.process.wait()
+                self.process = None
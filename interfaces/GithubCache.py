@@ -0,0 +1,192 @@
+import hashlib
+import json
+import logging
+import os
+import time
+
+from sqlalchemy import Column, Integer, Float, String, Text, create_engine, delete, event, func, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.declarative import declarative_base
+
+Base = declarative_base()
+
+RATE_LIMIT_HEADERS = ("x-ratelimit-limit", "x-ratelimit-remaining", "x-ratelimit-reset", "x-ratelimit-used", "x-ratelimit-resource")
+
+class CachedResponse(Base):
+    __tablename__ = 'responses'
+    
+    key = Column(String, primary_key=True)
+    url = Column(String)
+    status = Column(Integer)
+    headers = Column(Text)
+    body = Column(Text)
+    etag = Column(String)
+    lastModified = Column(String)
+    storedAt = Column(Float)
+    lastUsed = Column(Float, index=True)
+    size = Column(Integer)
+
+class ResponseFromCache:
+    """Mimics the response object returned by PyGithub's connection classes."""
+    
+    def __init__(self, status: int, headers: dict, body: str):
+        self.status = status
+        self.headers = headers
+        self.text = body
+    
+    def getheaders(self):
+        return self.headers.items()
+    
+    def read(self):
+        return self.text
+
+class GithubResponseCache:
+    """On-disk cache of the GET responses of the GitHub API.
+    
+    Responses are stored with their ETag and Last-Modified headers. Within `ttl` seconds a response is served without any request,
+    after that it is revalidated with a conditional request: a 304 answer does not count against the rate limit and the stored body is served.
+    The total size of the stored bodies is bounded by `max_bytes`, the least recently used responses are evicted first.
+    In `offline` mode every response is served from the cache and a missing one gives a 504 error, so no API call is ever made."""
+    
+    def __init__(self, db_path: str = None, ttl: float = None, max_bytes: int = None, offline: bool = None) -> None:
+        self.db_path = db_path or os.getenv("GITHUB_CACHE_PATH", "./GithubCache.db")
+        self.ttl = ttl if ttl is not None else float(os.getenv("GITHUB_CACHE_TTL", 0))
+        self.max_bytes = max_bytes or int(os.getenv("GITHUB_CACHE_MAX_BYTES", 1 << 30))
+        self.offline = offline if offline is not None else os.getenv("GITHUB_OFFLINE", "false").lower() in ("1", "true", "yes")
+        self.engine = create_engine('sqlite:///' + self.db_path, connect_args={"check_same_thread": False})
+        event.listen(self.engine, "connect", self.__set_pragmas)
+        Base.metadata.create_all(self.engine)
+    
+    @staticmethod
+    def __set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+    
+    @staticmethod
+    def key(url: str, headers: dict):
+        """Computes the cache key of a request from its url and the headers that change the response (credentials are only hashed)."""
+        headers = {k.lower(): v for k, v in headers.items()}
+        digest = hashlib.sha256(url.encode("utf-8"))
+        for name in ("authorization", "accept"):
+            digest.update(b"\0" + headers.get(name, "").encode("utf-8"))
+        return digest.hexdigest()
+    
+    def get(self, key: str):
+        """Retrieves a stored response and marks it as recently used.
+        
+        Returns:
+            CachedResponse or None: The stored response, if any."""
+        with self.engine.begin() as conn:
+            row = conn.execute(select(CachedResponse.__table__).where(CachedResponse.key == key)).fetchone()
+            if row is not None:
+                conn.execute(update(CachedResponse).where(CachedResponse.key == key).values(lastUsed=time.time()))
+        return row
+    
+    def is_fresh(self, row):
+        return time.time() - row.storedAt < self.ttl
+    
+    def revalidated(self, key: str):
+        """Records that a stored response was confirmed by a 304 answer."""
+        with self.engine.begin() as conn:
+            conn.execute(update(CachedResponse).where(CachedResponse.key == key).values(storedAt=time.time()))
+    
+    def put(self, key: str, url: str, status: int, headers: dict, body: str):
+        """Stores a response, then evicts the least recently used ones if the cache is over its size limit."""
+        headers = {k.lower(): v for k, v in headers.items() if k.lower() not in RATE_LIMIT_HEADERS}
+        now = time.time()
+        values = {
+            "key": key, "url": url, "status": status, "headers": json.dumps(headers), "body": body,
+            "etag": headers.get("etag"), "lastModified": headers.get("last-modified"),
+            "storedAt": now, "lastUsed": now, "size": len(body or "")
+        }
+        stmt = insert(CachedResponse).values(**values)
+        stmt = stmt.on_conflict_do_update(index_elements=[CachedResponse.key], set_={k: v for k, v in values.items() if k != "key"})
+        with self.engine.begin() as conn:
+            conn.execute(stmt)
+            total = conn.execute(select(func.coalesce(func.sum(CachedResponse.size), 0))).scalar()
+        if total > self.max_bytes:
+            self.evict(total - self.max_bytes)
+    
+    def evict(self, to_free: int):
+        """Deletes the least recently used responses until `to_free` bytes are released."""
+        victims = []
+        with self.engine.begin() as conn:
+            for key, size in conn.execute(select(CachedResponse.key, CachedResponse.size).order_by(CachedResponse.lastUsed)):
+                victims.append(key)
+                to_free -= size
+                if to_free <= 0:
+                    break
+            for i in range(0, len(victims), 500):
+                conn.execute(delete(CachedResponse).where(CachedResponse.key.in_(victims[i:i + 500])))
+    
+    def clean(self):
+        """Disposes of the engine and removes the cache database file."""
+        self.engine.dispose()
+        os.remove(self.db_path)
+
+def cached_connection_class(base, cache: GithubResponseCache):
+    """Builds a subclass of one of PyGithub's connection classes that answers GET requests through `cache`.
+    
+    Args:
+        base (type): `HTTPRequestsConnectionClass` or `HTTPSRequestsConnectionClass` from `github.Requester`.
+        cache (GithubResponseCache): The response cache to use.
+    
+    Returns:
+        type: The connection class to inject into PyGithub's `Requester`."""
+    
+    from github.Requester import RequestsResponse
+    
+    class CachedConnectionClass(base):
+        def getresponse(self):
+            # The request is read once: the connection object must not be read again or modified while it is being answered.
+            verb, headers, body = self.verb, self.headers, self.input
+            url = f"{self.protocol}://{self.host}:{self.port}{self.url}"
+            if verb.upper() != "GET":
+                return self.__send(verb, url, headers, body)
+            
+            key = cache.key(url, headers)
+            row = cache.get(key)
+            if row is not None and (cache.offline or cache.is_fresh(row)):
+                return ResponseFromCache(row.status, json.loads(row.headers), row.body)
+            if cache.offline:
+                logging.warning(f"Offline mode: no cached response for {url}")
+                return ResponseFromCache(504, {}, json.dumps({"message": f"No cached response for {url} in offline mode"}))
+            
+            if row is not None:
+                headers = dict(headers)
+                if row.etag:
+                    headers["If-None-Match"] = row.etag
+                if row.lastModified:
+                    headers["If-Modified-Since"] = row.lastModified
+            response = self.__send(verb, url, headers, body)
+            
+            if response.status == 304 and row is not None:
+                cache.revalidated(key)
+                headers = json.loads(row.headers)
+                headers.update({k.lower(): v for k, v in response.getheaders() if k.lower() in RATE_LIMIT_HEADERS})
+                return ResponseFromCache(row.status, headers, row.body)
+            if response.status == 200:
+                cache.put(key, url, response.status, dict(response.getheaders()), response.read())
+            return response
+        
+        def __send(self, verb, url, headers, body):
+            """Sends a request like the base class does, but from the given values instead of the attributes set by `request`."""
+            send = getattr(self.session, verb.lower())
+            return RequestsResponse(send(url, headers=headers, data=body, timeout=self.timeout, verify=self.verify, allow_redirects=False))
+    
+    return CachedConnectionClass
+
+def install_response_cache(cache: GithubResponseCache):
+    """Makes every `Github` client of the process go through the given response cache.
+    
+    Args:
+        cache (GithubResponseCache): The response cache to use."""
+    from github.Requester import Requester, HTTPRequestsConnectionClass, HTTPSRequestsConnectionClass
+    Requester.injectConnectionClasses(
+        cached_connection_class(HTTPRequestsConnectionClass, cache),
+        cached_connection_class(HTTPSRequestsConnectionClass, cache)
+    )
+    # injectConnectionClasses also makes every request close the connection and open a new one, which is only meant for PyGithub's replay tests
+    Requester._Requester__persist = True
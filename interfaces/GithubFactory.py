@@ -3,7 +3,12 @@ import re
 import os
 import subprocess
 
+from collections import deque
+from github.PullRequest import PullRequest as PullRequestObject
 from interfaces.AbcFactoryGit import AbcFactoryGit
+from interfaces.FetchEngine import FetchEngine
+from interfaces.GitReader import GitReader
+from interfaces.Database.FileIdResolver import FileIdResolver
 from models.repository import Repository
 from models.issue import Issue
 from models.pullRequest import PullRequest
@@ -12,26 +17,28 @@ from models.comment import Comment
 from models.gitFile import GitFile
 from progress.bar import IncrementalBar
 from progress.spinner import PixelSpinner
-from utils.missingFileException import MissingFileException
 
 class GithubFactory(AbcFactoryGit):
     
-    def __init__(self, g, db):
+    def __init__(self, g, db, engine = None):
         self.g = g
         self.file_id = 0
         self.db = db
         self.previousSha = 0
+        self.engine = engine or FetchEngine(g)
+        self.fileResolver = None
     
-    def get_issue(self, number: int):
+    def get_issue(self, number: int, repository = None):
         """Gets an issue from the Github API.
         
         Parameters:
         number: The issue number.
+        repository: The Github repository to get the issue from, the current repository by default.
         
         Returns:
         A tuple containing the Github issue object and the local Issue model object."""
         try:
-            issue = self.repository.get_issue(number=number)
+            issue = (repository or self.repository).get_issue(number=number)
         except:
             logging.exception(f"Could not find Issue with ID : {number}")
             return 0, 0
@@ -43,32 +50,28 @@ class GithubFactory(AbcFactoryGit):
             repositoryId = self.repository.id
         )
     
-    def get_modified_files(self, pull: PullRequest, pullId: int):
+    def get_modified_files(self, pull: PullRequest, pullId: int, files: list = None):
         """Gets modified files from a pull request. 
         
         Iterates through the files modified in the pull request, assigns 
         each one an id, and yields ModifiedFiles objects containing file
         details and the pull request id.
+        The ids come from the repository's `FileIdResolver`: files missing from the db are inserted together.
         
         Parameters:
-            max_id_db (int): The maximum id currently stored in the db.
+            pull: The Github pull request.
+            pullId (int): The id of the pull request in the db.
+            files (list, optional): The files of the pull request, when already fetched by `fetch_pull_data`.
         
         Yields:
             ModifiedFiles: The modified file with details and pull request id."""
         
-        files = pull.get_files()
+        if files is None:
+            files = list(pull.get_files())
+        fileIds = self.get_file_resolver().resolve_many((file.filename, file.sha) for file in files)
         for file in files:
-            try:
-                fileId = self.db.get_file_id_by_filename(file.filename, self.repository.id)
-            except MissingFileException:
-                fileId = self.db.insert(GitFile(
-                    sha = file.sha,
-                    fileName = file.filename,
-                    repositoryId = self.repository.id
-                ))
-            
             yield ModifiedFiles(
-                gitFileId = fileId,
+                gitFileId = fileIds[file.filename],
                 pullRequestId = pullId,
                 status = file.status,
                 patch = file.patch,
@@ -77,45 +80,52 @@ class GithubFactory(AbcFactoryGit):
                 changes = file.changes
             )
     
-    def get_pull_requests(self):
-        """Searches for merged pull requests linked to issues.
+    def get_file_resolver(self):
+        """Returns the path -> GitFile id resolver of the current repository, created on first use."""
+        if self.fileResolver is None:
+            self.fileResolver = FileIdResolver(self.db, self.repository.id)
+        return self.fileResolver
+    
+    def get_pull_requests(self, since = None):
+        """Searches for merged pull requests linked to issues, from the least to the most recently updated.
         
         Iterates through merged pull requests, extracting linked issue ids. 
         Creates PullRequest objects containing issue ids.
+        The pull requests and their comments are fetched concurrently through `self.engine`.
+        
+        Parameters:
+            since (datetime, optional): Only the pull requests updated at or after this time are returned.
         
         Returns:
             pullList: List of PullRequest objects
-            pulls: Raw search results"""
+            pulls: Raw search results
+            issueNumbers: The number of the issue linked to each pull request, None when no issue reference was found"""
         
-        pulls = []
-        issues = self.g.search_issues(query=f"repo:{self.repository.full_name} is:pr is:merged linked:issue sort:created-asc")
+        query = f"repo:{self.repository.full_name} is:pr is:merged linked:issue sort:updated-asc"
+        if since is not None:
+            query += f" updated:>={since.strftime('%Y-%m-%dT%H:%M:%SZ')}"
+        issues = self.g.search_issues(query=query)
         
         issueBar = IncrementalBar("Fetching issues", max = issues.totalCount)
+        pullNumbers = []
         for issue in issues:
             issueBar.next()
-            pullHtmlId = issue.pull_request.html_url.rsplit('/', 1)[-1]
-            pull = self.repository.get_pull(number = int(pullHtmlId))
-            pulls.append(pull)
+            pullNumbers.append(int(issue.pull_request.html_url.rsplit('/', 1)[-1]))
         issueBar.finish()
         
-        pullList, issueNumbers = [], []
-        pullBar = IncrementalBar("Fetching pulls", max = len(pulls))
-        for pull in pulls:
+        pulls, pullList, issueNumbers = [], [], []
+        pullBar = IncrementalBar("Fetching pulls", max = len(pullNumbers))
+        for pull, comments in self.engine.map(self.__fetch_pull, pullNumbers):
             pullBar.next()
             title_ids = self.__find_issues_ids_in_text(pull.title)
-            if pull.body is not None:
-                body_ids = self.__find_issues_ids_in_text(pull.body)
+            body_ids = self.__find_issues_ids_in_text(pull.body) if pull.body is not None else []
             comment_ids = []
-            for comment in pull.get_comments():
+            for comment in comments:
                 comment_ids.extend(self.__find_issues_ids_in_text(comment.body))
             
-            if title_ids:
-                issueNumbers.append(int(title_ids[0]))
-            elif body_ids:
-                issueNumbers.append(int(body_ids[0]))
-            elif comment_ids:
-                issueNumbers.append(int(comment_ids[0]))
-            
+            linked_ids = title_ids or body_ids or comment_ids
+            issueNumbers.append(int(linked_ids[0]) if linked_ids else None)
+            pulls.append(pull)
             pullList.append(PullRequest(
                 githubId = pull.id,
                 title = pull.title,
@@ -127,6 +137,38 @@ class GithubFactory(AbcFactoryGit):
         pullBar.finish()
         return pullList, pulls, issueNumbers
     
+    def __fetch_pull(self, number: int):
+        """Fetches a pull request and its review comments. Runs on the fetch engine's threads."""
+        pull = self.__thread_repository().get_pull(number = number)
+        return pull, list(pull.get_comments())
+    
+    def __thread_repository(self):
+        """Returns the current repository bound to the fetch engine's client of the current thread, without any API call."""
+        return self.engine.client().get_repo(self.repository.full_name, lazy = True)
+    
+    def fetch_pull_data(self, pulls: list, issueNumbers: list):
+        """Fetches, concurrently, the linked issue, the issue comments and the modified files of each pull request.
+        
+        Parameters:
+            pulls (list): The Github pull requests returned by `get_pull_requests`.
+            issueNumbers (list): The number of the issue linked to each pull request.
+        
+        Yields:
+            tuple: (issue, issueItem, comments, files) for each pull request, in order. issue and issueItem are 0 when the issue could not be fetched."""
+        yield from self.engine.map(self.__fetch_item, zip(pulls, issueNumbers))
+    
+    def __fetch_item(self, item):
+        """Fetches the data of one pull request for `fetch_pull_data`. Runs on the fetch engine's threads."""
+        pull, issueNumber = item
+        if issueNumber is None:
+            return 0, 0, [], []
+        repository = self.__thread_repository()
+        issue, issueItem = self.get_issue(issueNumber, repository)
+        if issue == 0:
+            return 0, 0, [], []
+        pull = PullRequestObject(repository._requester, pull.raw_headers, pull.raw_data, completed = True)
+        return issue, issueItem, list(issue.get_comments()), list(pull.get_files())
+    
     def get_repository(self, repo_name: str):
         """Gets a GitHub repository object for the given repository name.
         
@@ -138,6 +180,7 @@ class GithubFactory(AbcFactoryGit):
             description, language, and star count."""
         
         self.repository = self.g.get_repo(repo_name)
+        self.fileResolver = None
         return Repository(
             id = self.repository.id,
             fullName = self.repository.full_name,
@@ -146,19 +189,21 @@ class GithubFactory(AbcFactoryGit):
             stars = self.repository.stargazers_count
         )
     
-    def get_comments(self, issue: Issue, issueId: int):
+    def get_comments(self, issue: Issue, issueId: int, comments: list = None):
         """Gets the comments for the pull request associated with the issue at index j.
         
         Iterates through the comments for the issue and yields Comment objects containing 
         the comment details.
         
         Parameters:
-            j (int): The index of the issue to get comments for.
+            issue: The Github issue to get comments for.
+            issueId (int): The id of the issue in the db.
+            comments (list, optional): The comments of the issue, when already fetched by `fetch_pull_data`.
         
         Yields:
             Comment: The next comment for the issue."""
         
-        self.comments = issue.get_comments()
+        self.comments = issue.get_comments() if comments is None else comments
         for comment in self.comments:
             yield Comment(
                 githubId = comment.id,
@@ -166,18 +211,40 @@ class GithubFactory(AbcFactoryGit):
                 issueId = issueId
             )
     
-    def get_gitFiles(self):
-        """Recursively fetches all files in the repository, yielding a GitFile object for each file.
+    def get_gitFiles(self, path_repos: str = None):
+        """Fetches all files of the default branch of the repository, yielding a GitFile object for each file.
         
-        The method uses a PixelSpinner to provide visual feedback while fetching the files.
-        It first gets the contents of the repository root directory, then recursively fetches the contents of any subdirectories.
-        For each file, it yields a GitFile object containing the file's SHA, file name, and repository ID."""
+        The files are listed with a single recursive tree request on the default branch SHA.
+        When GitHub truncates the tree (very large repositories), they are listed with `git ls-tree` on the local clone at `path_repos` if it exists,
+        and with a crawl of the directories through the contents API otherwise.
+        For each file, it yields a GitFile object containing the file's SHA, file name, and repository ID.
         
-        contents = self.repository.get_contents("")
+        Parameters:
+            path_repos (str, optional): The path of a local clone of the repository."""
+        
+        branch = self.repository.get_branch(self.repository.default_branch)
+        tree = self.repository.get_git_tree(branch.commit.sha, recursive=True)
+        if not tree.raw_data.get("truncated", False):
+            for element in tree.tree:
+                if element.type == "blob":
+                    yield GitFile(sha = element.sha, fileName = element.path, repositoryId = self.repository.id)
+            return
+        
+        logging.warning(f"Tree of {self.repository.full_name} truncated by the API, listing the files another way")
+        if path_repos is not None and os.path.exists(path_repos):
+            subprocess.run(["git", "fetch", "--quiet", "origin"], cwd=path_repos)
+            for path, sha in GitReader(path_repos).list_entries(branch.commit.sha):
+                yield GitFile(sha = sha, fileName = path, repositoryId = self.repository.id)
+        else:
+            yield from self.__crawl_gitFiles()
+    
+    def __crawl_gitFiles(self):
+        """Crawls the repository directory by directory through the contents API, with a PixelSpinner as visual feedback."""
+        contents = deque(self.repository.get_contents(""))
         contentSpinner = PixelSpinner("Fetching files ")
         while contents:
             contentSpinner.next()
-            file = contents.pop(0)
+            file = contents.popleft()
             if file.type == "dir":
                 contents.extend(self.repository.get_contents(file.path))
             else:
@@ -218,33 +285,49 @@ class GithubFactory(AbcFactoryGit):
             if i == int(nb_repo):
                 break
     
-    def setup_repo(self, shaBase, repoFullName: str, path_repos: str):
+    def setup_repo(self, shaBase, repoFullName: str, path_repos: str, checkout: bool = True):
         """Sets up a local repository clone, checks out the specified base commit SHA, and returns the list of files that have changed between the base commit and the previous commit.
         
         Parameters:
             shaBase (str): The commit SHA of the base commit to check out.
             repoFullName (str): The full name of the GitHub repository in the format "user/repo".
             path_repos (str): The local path where the repository should be cloned.
+            checkout (bool): Whether to check the commit out. When False, the working tree is left untouched and the files are expected to be read with a `GitReader`.
         
         Returns:
             list[str]: The list of file paths that have changed between the base commit and the previous commit."""
-            
+        
+        self.clone_repo(repoFullName, path_repos)
+        return self.__get_file_diff(shaBase, path_repos, checkout)
+    
+    def clone_repo(self, repoFullName: str, path_repos: str):
+        """Clones the repository under ./test, unless it was already cloned.
+        
+        Parameters:
+            repoFullName (str): The full name of the GitHub repository in the format "user/repo".
+            path_repos (str): The local path of the repository clone."""
         if not os.path.exists(path_repos):
             if not os.path.exists("./test"):
                 os.mkdir("./test")
             os.system(f"cd ./test && git clone https://github.com/{repoFullName}")
-        
-        return self.__get_file_diff(shaBase, path_repos)
     
-    def __get_file_diff(self, shaBase, path_repos):
-        os.system(f"cd {path_repos} && git checkout {shaBase}")
-        if self.previousSha == 0:
-            self.previousSha = shaBase
+    def __get_file_diff(self, shaBase, path_repos, checkout = True):
+        """Optionally checks out the given commit and lists the files changed since the previous one.
+        
+        Parameters:
+            shaBase (str): The commit SHA to check out.
+            path_repos (str): The local path of the repository clone.
+            checkout (bool): Whether to check the commit out.
+        
+        Returns:
+            list[str] | None: The paths of the changed files, relative to the repository root, or None for the first commit."""
+        if checkout:
+            os.system(f"cd {path_repos} && git checkout {shaBase}")
+        previousSha, self.previousSha = self.previousSha, shaBase
+        if previousSha == 0:
             return None
-        else:
-            command = f"cd ./test/gpt-pilot/ && git diff --name-only {shaBase} {self.previousSha}"
-            commandReturn = subprocess.run(command, shell=True, capture_output=True, text=True)
-            return commandReturn.stdout.strip().split('\n')
+        commandReturn = subprocess.run(["git", "diff", "--name-only", previousSha, shaBase], cwd=path_repos, capture_output=True, text=True)
+        return [line for line in commandReturn.stdout.strip().split('\n') if line]
     
     def __find_issues_ids_in_text(self, text):
         """Gets issue ids from pr text.
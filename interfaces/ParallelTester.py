@@ -0,0 +1,105 @@
+import logging
+import math
+import multiprocessing
+import os
+import sys
+import traceback
+
+from interfaces.Database.EmbeddingOverlay import EmbeddingOverlay
+from interfaces.GitReader import GitReader
+from utils.workPlan import issue_text
+
+class ParallelTester:
+    """Runs the semantic test of the commits of a work plan in parallel worker processes.
+    
+    The workers are forked once the backend is built, so the models are shared copy-on-write. Each worker reads the commits
+    with its own checkout-free `GitReader` and computes its diffs itself, and the embedding storage is wrapped in an `EmbeddingOverlay`:
+    it is only read during the run, and the embeddings computed by the workers are sent back to the calling process, as well as their writes to the backend's cache.
+    The calling process is the only writer: it stores the test results as they come and saves the embeddings and the cache entries at the end.
+    
+    The plan is cut into contiguous chunks of commits, about four per worker, handed out through a queue, so the consecutive commits
+    of a worker stay close in history while the load is balanced."""
+    
+    def __init__(self, workers: int = None, threads: int = None):
+        self.workers = workers or int(os.getenv("SEMANTIC_WORKERS", os.cpu_count() or 1))
+        self.threads = threads or int(os.getenv("SEMANTIC_WORKER_THREADS", 1))
+    
+    def run(self, semantic, embedding, repoFullName: str, path_repos: str, plan: list, k: int = None):
+        """Tests the commits of the plan and yields the results as the workers produce them.
+        
+        Args:
+            semantic (SemanticTest): The backend, already initialized with `init_repo`.
+            embedding (EmbeddingDbI): The embedding storage of the backend.
+            repoFullName (str): The full name of the repository.
+            path_repos (str): The local path of the repository clone.
+            plan (list): The commits and their issues, see `utils.workPlan.plan_commits`.
+            k (int, optional): The number of files to keep per issue.
+        
+        Yields:
+            tuple: ("result", issueId, results) for each issue, and ("embeddings", position, rows, cache) with the embeddings computed for the commit at `position` in the plan
+                and the cache writes buffered meanwhile (see `SemanticTest.drain_cache`).
+        
+        Raises:
+            RuntimeError: If a worker fails. The other workers are stopped."""
+        context = multiprocessing.get_context("fork")
+        tasks, events = context.Queue(), context.Queue()
+        indexed = list(enumerate(plan))
+        size = max(1, math.ceil(len(indexed) / (self.workers * 4)))
+        for i in range(0, len(indexed), size):
+            tasks.put(indexed[i:i + size])
+        workers = min(self.workers, math.ceil(len(indexed) / size)) if indexed else 0
+        for _ in range(workers):
+            tasks.put(None)
+        
+        processes = [
+            context.Process(target=_work, args=(semantic, embedding, repoFullName, path_repos, k, self.threads, tasks, events), daemon=True)
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        logging.info(f"{len(plan)} commits dispatched to {workers} workers")
+        
+        running = workers
+        try:
+            while running:
+                event = events.get()
+                if event[0] == "done":
+                    running -= 1
+                elif event[0] == "error":
+                    raise RuntimeError(f"A semantic test worker failed:\n{event[1]}")
+                else:
+                    yield event
+        finally:
+            for process in processes:
+                if running:
+                    process.terminate()
+                process.join()
+
+def _work(semantic, embedding, repoFullName, path_repos, k, threads, tasks, events):
+    """Body of a worker process: tests the chunks of commits taken from `tasks` and puts the results on `events`."""
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+    reader = None
+    try:
+        overlay = EmbeddingOverlay(embedding)
+        semantic.init_repo(repoFullName, overlay)
+        semantic.init_worker()
+        reader = GitReader(path_repos)
+        previous = None
+        while True:
+            chunk = tasks.get()
+            if chunk is None:
+                break
+            for position, (sha, group) in chunk:
+                diff = reader.changed_files(previous, sha) if previous else None
+                semantic.prepare(diff, sha)
+                previous = sha
+                events.put(("embeddings", position, overlay.drain(), semantic.drain_cache()))
+                for title, body, issueId in group:
+                    events.put(("result", issueId, semantic.score(issue_text(title, body), k)))
+    except Exception:
+        events.put(("error", traceback.format_exc()))
+    finally:
+        if reader is not None:
+            reader.close()
+        events.put(("done",))
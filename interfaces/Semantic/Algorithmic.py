@@ -1,24 +1,20 @@
-import re
 import os
-import nltk
+import utils.nlpResources as nlp
 
-from nltk.corpus import words, wordnet
-from autocorrect import Speller
-from pygments.token import Token
 from pygments.lexers import get_lexer_for_filename
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.feature_extraction.text import TfidfVectorizer
 from interfaces.Semantic.SemanticTest import SemanticTest
+from interfaces.Semantic.TfidfIndex import TfidfIndex
+from interfaces.GitReader import GitReader, WorkTreeReader
 from progress.bar import IncrementalBar
+from utils.rankings import rank_files
 
 class Algorithmic(SemanticTest):
-    def __init__(self):
-        try:
-            nltk.data.find('corpora/wordnet.zip')
-            nltk.data.find('corpora/words.zip')
-        except LookupError:
-            nltk.download('wordnet')
-            nltk.download('words')
+    def __init__(self, cache = None):
+        """Loads the NLP corpora.
+        
+        Args:
+            cache (EmbeddingCache, optional): Accepted so that the backend can replace CodeT5 in the container, but unused: the TF-IDF index keeps the file texts itself."""
+        nlp.ensure_corpora()
     
     def init_repo(self, repoFullName: str, embedding):
         """Initializes a repository by setting the repository name, path, and regular expression for function names. It also stores the embedding object for the repository.
@@ -33,8 +29,15 @@ class Algorithmic(SemanticTest):
         self.path_repos = f"./test/{self.repoName}"
         self.regex_function_name = r"def\s+(\w+)"
         self.embedding_db = embedding
+        self.worktree_reader = WorkTreeReader(self.path_repos)
+        self.git_reader = GitReader(self.path_repos)
+        self.index = TfidfIndex(os.path.join(os.getenv("TFIDF_INDEX_PATH", "./tfidf"), self.repoName))
         return self.path_repos
     
+    def init_worker(self):
+        """Adapts the backend to a worker process of the parallel semantic test: the TF-IDF index of the worker is kept in memory, so the workers do not overwrite each other's saved index."""
+        self.index.autosave = False
+    
     def __expand_acronyms_with_wordnet(self, text):
         """Expands acronyms in the given text using WordNet.
         
@@ -44,15 +47,11 @@ class Algorithmic(SemanticTest):
         Returns:
             str: The input text with acronyms expanded."""
         expanded_text = text
-        pattern = re.compile(r'\b[A-Z]+\b')
-        acronyms = pattern.findall(text)
+        acronyms = nlp.ACRONYM_PATTERN.findall(text)
         for acronym in acronyms:
-            synsets = wordnet.synsets(acronym)
-            if synsets:
-                hypernyms = synsets[0].hypernyms()
-                if hypernyms:
-                    expansion = hypernyms[0].lemmas()[0].name().replace('_', ' ')
-                    expanded_text = expanded_text.replace(acronym, expansion)
+            expansion = nlp.expand_acronym(acronym)
+            if expansion is not None:
+                expanded_text = expanded_text.replace(acronym, expansion)
         return expanded_text
     
     def __replace_acronyms(self, text):
@@ -63,7 +62,7 @@ class Algorithmic(SemanticTest):
         
         Returns:
             str: The input text with acronyms replaced."""
-        english_word_set = set(words.words())
+        english_word_set = nlp.english_words()
         expanded_text = self.__expand_acronyms_with_wordnet(text)
         for word in text.split():
             if word.isupper():
@@ -81,98 +80,87 @@ class Algorithmic(SemanticTest):
         
         Returns:
             str: The function name split into individual words."""
-        modified_string = list(map(lambda x: '_' + x if x.isupper() else x, s))
-        split_string = ''.join(modified_string).split('_')
-        split_string = list(filter(lambda x: x != '', split_string))
-        return " ".join(split_string)
+        return nlp.split_identifier(s)
     
-    def __transform_code_into_text(self, filename, recalculate):
+    def __transform_code_into_text(self, reader, sha, filename, recalculate):
         """Transforms the code in the given file into a text representation by extracting comments, strings, and function/variable names.
         
         Args:
-            filename (str): The path to the file to transform.
+            reader (WorkTreeReader | GitReader): The reader used to read the file.
+            sha (str): The commit to read the file from.
+            filename (str): The path of the file, relative to the repository root.
             recalculate (bool): Whether to recalculate the text representation or use a cached version.
         
         Returns:
             str: The text representation of the code in the file."""
-        if recalculate is None:
+        if not recalculate:
             cached_text = self.embedding_db.get_embedding(filename)
             if cached_text is not None:
                 return cached_text
 
-        with open(filename, encoding="utf8") as f:
-            lines = ''.join(f.readlines())
+        code = reader.read_file(sha, filename)
 
-        s = ""
+        parts = []
         lexer = get_lexer_for_filename(filename)
-        tokens = lexer.get_tokens(lines)
-        for token in tokens:  
-            token_type, token_value = token[0], token[1]
-            comments_tokens = {Token.Literal.String.Doc, Token.Comment.Single, Token.Comment.Multiline}
-            name_tokens = {Token.Name.Function, Token.Name}
+        for token_type, token_value in lexer.get_tokens(code):
+            if token_type in nlp.COMMENT_TOKENS:
+                parts.append(token_value)
+            elif token_type == nlp.STRING_TOKEN:
+                if token_value not in nlp.IGNORED_STRINGS:
+                    parts.append(token_value)
+            elif token_type in nlp.NAME_TOKENS:
+                parts.append(self.__split_function_name(token_value))
 
-            if token_type in comments_tokens:
-                s += ' ' + token_value
-            elif token_type == Token.Literal.String.Single:
-                if token_value not in ["'", ':', ';']:
-                    s += ' ' + token_value
-            elif token_type in name_tokens:
-                s += ' ' + self.__split_function_name(token_value)
-
-        s = " ".join(s.split())
+        s = " ".join(" ".join(parts).split())
         s = self.__replace_acronyms(s)
-        spell = Speller()
-        s = spell(s)
+        s = nlp.correct_text(s)
 
         self.embedding_db.save_embedding(filename, s)
         return s
     
-    def __text_similarity_scikit(self, text1, text2):
-        """Calculates the text similarity between two input texts using the scikit-learn TF-IDF vectorizer and cosine similarity.
-        
-        Args:
-            text1 (str): The first text to compare.
-            text2 (str): The second text to compare.
-        
-        Returns:
-            list: A list containing the cosine similarity score between the two input texts."""
-        # Convert the texts into TF-IDF vectors
-        vectorizer = TfidfVectorizer()
-        vectors = vectorizer.fit_transform([text1, text2])
-
-        # Calculate the cosine similarity between the vectors
-        similarity = cosine_similarity(vectors)
-        return similarity
-    
-    def get_max_file_score_from_issue(self, text: str, files_to_recalculate=[]):
+    def get_max_file_score_from_issue(self, text: str, files_to_recalculate=None, sha=None):
         """Generates a list of files and their similarity scores to the given text, sorted in descending order by similarity score.
         
+        Only the files that are new or listed in `files_to_recalculate` are transformed into text again, the others are already in the repository's `TfidfIndex`.
+        
         Args:
             text (str): The text to compare against the files.
-            files_to_recalculate (list, optional): A list of file paths to recalculate the similarity score for. Defaults to an empty list.
+            files_to_recalculate (list, optional): A list of file paths to recalculate the similarity score for. Defaults to None.
+            sha (str, optional): The commit to read the files from, straight from the git object store. When None, the checked out files are read.
         
         Returns:
             list: A list of tuples, where the first element is the file path and the second element is the similarity score."""
-        s1 = []
-        recalculate = None
-        regex_real_file_path = fr"\.\/test\/{self.repoName}\\(.+)"
-        function_bar = IncrementalBar(f"Generating semantic token via Algorithmic", max=sum(len(files) for _, _, files in os.walk(self.path_repos)))
-        
-        for root, _, files in os.walk(self.path_repos):
-            for file in files:
-                function_bar.next()
-                if file.endswith('.py'):
-                    filename = os.path.join(root, file)
-                    if files_to_recalculate is not None:
-                        recalculate = re.search(regex_real_file_path, filename).group(1).replace("\\", "/") in files_to_recalculate
-                    transformed_text = self.__transform_code_into_text(filename, recalculate)
-                    score = self.__text_similarity_scikit(transformed_text, text)
-                    s1.append([filename, score[0][1]])
+        self.prepare(files_to_recalculate, sha)
+        return self.score(text)
+    
+    def prepare(self, files_to_recalculate=None, sha=None):
+        """Brings the repository's `TfidfIndex` up to date with a commit, so that several issues sharing that commit can be scored with `score`.
+        
+        Args:
+            files_to_recalculate (list, optional): The files changed since the previous call.
+            sha (str, optional): The commit to read the files from. When None, the checked out files are read."""
+        files_to_recalculate = set(files_to_recalculate or [])
+        reader = self.git_reader if sha else self.worktree_reader
+        files = [file for file in reader.list_files(sha) if file.endswith('.py')]
+        to_transform = [file for file in files if file in files_to_recalculate or file not in self.index]
+        function_bar = IncrementalBar(f"Generating semantic token via Algorithmic", max=len(to_transform))
+        
+        texts = {}
+        for filename in to_transform:
+            function_bar.next()
+            texts[filename] = self.__transform_code_into_text(reader, sha, filename, filename in files_to_recalculate)
+        self.index.update(texts, removed=set(self.index.docs) - set(files))
 
         function_bar.finish()
-        
-        for input in s1:
-            input[0] = re.search(regex_real_file_path, input[0]).group(1).replace("\\", "/")
-        return sorted(s1, key=lambda x: x[1], reverse=True)
     
-    
\ No newline at end of file
+    def score(self, text: str, k: int = None):
+        """Scores the files indexed by the last `prepare` call against an issue.
+        
+        Args:
+            text (str): The text of the issue.
+            k (int, optional): The number of files to return. Every file is returned when None.
+        
+        Returns:
+            list: The file path and similarity score of the best files, sorted by decreasing score."""
+        paths, scores = self.index.score(text)
+        return rank_files(paths, scores, k)
\ No newline at end of file
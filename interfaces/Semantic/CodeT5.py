@@ -1,23 +1,36 @@
-import ast
 import logging
-import astunparse
 import os
-import re
-import torch
+import numpy as np
 
 from interfaces.Semantic.SemanticTest import SemanticTest
-from sentence_transformers import SentenceTransformer, util
-from transformers import AutoModel, AutoTokenizer
+from interfaces.Database.EmbeddingCache import source_hash
+from interfaces.Database.EmbeddingOverlay import EmbeddingCacheOverlay
+from interfaces.Semantic.FunctionCatalogue import FunctionCatalogue
+from interfaces.GitReader import GitReader, WorkTreeReader
 from progress.bar import IncrementalBar
+from utils.rankings import rank_files
 
 class CodeT5(SemanticTest):
+    """Semantic test with CodeT5+ summaries of the functions, encoded with a sentence transformer and compared to the issues.
     
-    def __init__(self):
-        checkpoint = "Salesforce/codet5p-220m-bimodal"
-        self.device = os.getenv("DEVICE")
-        self.tokenizer = AutoTokenizer.from_pretrained(checkpoint, trust_remote_code=True)
-        self.codeT5 = AutoModel.from_pretrained(checkpoint, trust_remote_code=True).to(self.device)
-        self.bert = SentenceTransformer(os.getenv('SENTENCE_TRANSFORMER'))
+    The models are given as `models` (`LocalModels` or `RemoteModels`). By default they are loaded in the process,
+    or reached through the model server at `MODEL_SERVER_ADDRESS` when `MODEL_BACKEND` is "remote"."""
+    
+    def __init__(self, batch_size: int = None, max_batch_tokens: int = None, cache = None, models = None):
+        self.models = models or self.__load_models()
+        self.model_ids = self.models.model_ids
+        self.cache = cache
+        self.batch_size = batch_size or int(os.getenv("EMBED_BATCH_SIZE", 16))
+        self.max_batch_tokens = max_batch_tokens or int(os.getenv("EMBED_MAX_BATCH_TOKENS", 8192))
+    
+    @staticmethod
+    def __load_models():
+        """Builds the models selected by `MODEL_BACKEND`, importing only the modules they need."""
+        if os.getenv("MODEL_BACKEND", "local") == "remote":
+            from interfaces.Semantic.RemoteModels import RemoteModels
+            return RemoteModels()
+        from interfaces.Semantic.LocalModels import LocalModels
+        return LocalModels()
     
     def init_repo(self, repoFullName: str, embedding):
         """Initializes the repository path and other related attributes for the CodeT5 class.
@@ -30,117 +43,170 @@ class CodeT5(SemanticTest):
             str: The path to the repository directory."""
         self.repoName = repoFullName.split("/")[-1]
         self.path_repos = f"./test/{self.repoName}"
-        self.regex_real_file_path = fr"\.\/test\/{self.repoName}\\(.+)"
-        self.regex_function_name = r"def\s+(\w+)"
+        self.worktree_reader = WorkTreeReader(self.path_repos)
+        self.git_reader = GitReader(self.path_repos)
+        self.catalogue = FunctionCatalogue()
         self.embedding_db = embedding
+        self.embedding_db.open_repository(self.repoName, self.model_ids)
         return self.path_repos
     
-    def get_max_file_score_from_issue(self, text_issue: str, recompute_files = None):
+    def init_worker(self):
+        """Adapts the backend to a worker process of the parallel semantic test.
+        
+        The functions are parsed in the worker itself instead of a nested process pool, and the model server client opens its own connection.
+        The content-addressed cache is wrapped in an `EmbeddingCacheOverlay`: it is only read by the worker, the calling process writes the entries returned by `drain_cache`."""
+        self.catalogue = FunctionCatalogue(workers=1)
+        self.models.reset_connections()
+        if self.cache is not None:
+            self.cache = EmbeddingCacheOverlay(self.cache)
+    
+    def drain_cache(self):
+        return self.cache.drain() if isinstance(self.cache, EmbeddingCacheOverlay) else None
+    
+    def save_cache(self, drained: list):
+        if self.cache is not None and drained:
+            self.cache.save_drained(drained)
+    
+    def get_max_file_score_from_issue(self, text_issue: str, recompute_files = None, sha = None):
         """Finds the file and maximum semantic similarity score for a given issue text.
         
         Parameters:
             text_issue (str): The text of the issue to find the most similar code for.
+            recompute_files (list, optional): The files changed since the previous call.
+            sha (str, optional): The commit to read the code from, straight from the git object store. When None, the checked out files are read.
         
         Returns:
-            Tuple[str, float]: The relative file path of the most similar code and the maximum semantic similarity score."""
-        self.__embed_code(recompute_files)
-        return self.__compute_similarity(text_issue)
-    
-    def __separate_functions(self):
-        """Recursively walks through the repository directory and extracts the source code of all Python functions found in the files.
+            list[tuple[str, float]]: The relative path and score of every file, sorted by decreasing score."""
+        self.prepare(recompute_files, sha)
+        return self.score(text_issue)
     
-        The extracted function source code is stored in the `self.functions_sources` list, where each element is a list containing the file path and the function source code."""
-        for root, _, files in os.walk(self.path_repos):
-            for file in files:
-                if file.endswith(".py"):
-                    file_path = os.path.join(root, file)
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        file_content = f.read()
-                    
-                    parsed_tree = ast.parse(file_content)
-                    functions = [
-                        self.__extract_function_source(node)
-                        for node in ast.walk(parsed_tree)
-                        if isinstance(node, ast.FunctionDef)
-                    ]
-                    
-                    if functions:
-                        for function in functions:
-                            self.functions_sources.append([
-                                file_path,
-                                function
-                            ])
+    def prepare(self, recompute_files = None, sha = None):
+        """Brings the embeddings of the functions up to date with a commit, so that several issues sharing that commit can be scored with `score`.
+        
+        Parameters:
+            recompute_files (list, optional): The files changed since the previous call.
+            sha (str, optional): The commit to read the code from. When None, the checked out files are read."""
+        self.__embed_code(recompute_files, sha)
     
-    def __extract_function_source(self, node):
-        """Extracts the source code of a Python function from an AST node.
+    def score(self, text_issue: str, k: int = None):
+        """Scores the files embedded by the last `prepare` call against an issue.
         
-        Args:
-            node (ast.FunctionDef): The AST node representing the function definition.
+        The function scores are aggregated per file and only the best files are kept, see `utils.rankings.rank_files`.
+        
+        Parameters:
+            text_issue (str): The text of the issue.
+            k (int, optional): The number of files to return. Every file is returned when None.
         
         Returns:
-            str: The source code of the function."""
-        if isinstance(node, ast.FunctionDef):
-            return astunparse.unparse(node)
+            list[tuple[str, float]]: The file path and score of the best files, sorted by decreasing score."""
+        paths, similarities = self.__compute_similarity(text_issue)
+        return rank_files(paths, similarities, k)
     
-    def __embed_code(self, recompute_files = None):
+    def __embed_code(self, recompute_files = None, sha = None):
         """Embeds the source code of all Python functions found in the repository directory into a vector representation.
         
-        This method recursively walks through the repository directory and extracts the source code of all Python functions. It then generates an embedding for each function using a pre-trained language model (CodeT5) and stores the embeddings in a database.
+        The Python functions are listed by `self.catalogue`, which is kept across issues and only re-parses the files listed in `recompute_files`. The files are read at `sha` from the git object store, or from the working tree when no sha is given. It then generates an embedding for each function using a pre-trained language model (CodeT5) and stores the embeddings in a database.
         
         If the `recompute_files` parameter is provided, the method will recompute the embeddings for the specified files. Otherwise, it will only compute embeddings for files that do not have an existing embedding in the database.
         
+        The functions to embed are processed in padded batches grouped by token length (see `__make_batches`), with one `generate` and one `encode` call per batch. Setting `EMBED_BATCH_SIZE` to 1 gives back the one-function-at-a-time behaviour.
+        
+        When a content-addressed `cache` is given, functions whose normalized source was already embedded by the same models are taken from it instead of running the models.
+        
         The generated embeddings are stored in the `self.embedding_db` attribute, which can be used to retrieve the embeddings later."""
-        if recompute_files is None:
-            recompute_files = []
-        self.functions_sources = []
+        recompute_files = set(recompute_files or [])
+        self.catalogue.refresh(self.git_reader if sha else self.worktree_reader, sha, recompute_files)
+        self.functions_sources = functions = self.catalogue.functions()
+        stored = self.embedding_db.get_many([(file_path, function_name) for file_path, function_name, _ in functions])
+        to_embed = [
+            function for function in functions
+            if function[0] in recompute_files or (function[0], function[1]) not in stored
+        ]
         
-        self.__separate_functions()
-
-        for function_source in self.functions_sources:
-            file_path = re.search(self.regex_real_file_path, function_source[0]).group(1).replace("\\", "/")
-            function_name = re.search(self.regex_function_name, function_source[1]).group(1)
-            
-            if file_path in recompute_files or self.embedding_db.get_embedding(file_path, function_name) is None:
-                input_ids = self.tokenizer(function_source[1], return_tensors="pt").input_ids.to(self.device)
-                generated_ids = self.codeT5.generate(input_ids, max_length=20)
-                function_source.append(self.tokenizer.decode(generated_ids[0], skip_special_tokens=True))
-                
-                code_embedding = self.bert.encode(function_source[2], convert_to_tensor=True, show_progress_bar=False)
-                self.embedding_db.save_embedding(file_path, function_name, code_embedding)
+        if self.cache is not None:
+            to_embed = self.__reuse_cached_embeddings(to_embed)
+        
+        if not to_embed:
+            return
+        
+        function_bar = IncrementalBar("Embedding functions via CodeT5", max=len(to_embed))
+        for batch in self.__make_batches(to_embed):
+            summaries = self.models.summarize([function[2] for function in batch])
+            code_embeddings = self.models.encode(summaries)
+            self.embedding_db.save_many([
+                (file_path, function_name, code_embedding)
+                for (file_path, function_name, _), code_embedding in zip(batch, code_embeddings)
+            ])
+            if self.cache is not None:
+                self.cache.put_many([
+                    (source_hash(source, self.model_ids), code_embedding)
+                    for (_, _, source), code_embedding in zip(batch, code_embeddings)
+                ])
+            function_bar.next(len(batch))
+        self.embedding_db.flush()
+        function_bar.finish()
+    
+    def __reuse_cached_embeddings(self, functions):
+        """Saves the embeddings already present in the content-addressed cache and returns the functions that still need the models.
+        
+        Args:
+            functions (list): A list of (file_path, function_name, source) tuples to embed.
+        
+        Returns:
+            list: The (file_path, function_name, source) tuples whose source is not in the cache."""
+        hashes = [source_hash(source, self.model_ids) for _, _, source in functions]
+        cached = self.cache.get_many(hashes)
+        
+        hits = [(file_path, function_name, cached[hash]) for (file_path, function_name, _), hash in zip(functions, hashes) if hash in cached]
+        self.embedding_db.save_many(hits)
+        self.embedding_db.flush()
+        logging.info(f"{len(hits)} of {len(functions)} embeddings reused from the cache")
+        return [function for function, hash in zip(functions, hashes) if hash not in cached]
+    
+    def __make_batches(self, functions):
+        """Groups the functions to embed into batches of similar token length.
+        
+        The functions are sorted by their tokenized length so that each batch needs as little padding as possible.
+        A batch is closed when it reaches `self.batch_size` functions or when its padded size (number of functions times the longest one) would exceed `self.max_batch_tokens`.
+        A function longer than the token budget is always put alone in its own batch.
+        
+        Args:
+            functions (list): A list of (file_path, function_name, source) tuples.
+        
+        Yields:
+            list: The next batch of (file_path, function_name, source) tuples."""
+        lengths = self.models.token_lengths([function[2] for function in functions])
+        order = sorted(range(len(functions)), key=lambda i: lengths[i])
+        
+        batch, batch_max_length = [], 0
+        for i in order:
+            padded_length = max(batch_max_length, lengths[i])
+            if batch and (len(batch) >= self.batch_size or padded_length * (len(batch) + 1) > self.max_batch_tokens):
+                yield batch
+                batch, padded_length = [], lengths[i]
+            batch.append(functions[i])
+            batch_max_length = padded_length
+        if batch:
+            yield batch
     
     def __compute_similarity(self, text_issue: str):
         """Computes the similarity between a given text issue and the source code of all functions in the repository.
         
-        This method iterates through the list of function sources, retrieves the corresponding code embeddings from the database,
-        and computes the cosine similarity between the issue embedding and the code embedding.
-        The results are sorted in descending order by similarity and returned.
+        The issue is encoded once, the embeddings of every function found in the repository are loaded from the database
+        as one contiguous float32 matrix and all the cosine similarities are computed with a single matrix-vector product.
         
         Args:
             text_issue (str): The text of the issue for which to compute the similarity.
         
         Returns:
-            list: A list of tuples, where each tuple contains the file path and the similarity score for a function."""
-        result_similarity = []
-        function_bar = IncrementalBar(f"Generating semantic token via LLM", max=len(self.functions_sources))
-        
-        for function_source in self.functions_sources:
-            function_bar.next()
-            file_path = re.search(self.regex_real_file_path, function_source[0]).group(1).replace("\\", "/")
-            function_name = re.search(self.regex_function_name, function_source[1]).group(1)
-            issue_embedding = self.bert.encode(text_issue, convert_to_tensor=True, show_progress_bar=False)
-            
-            try:
-                code_embedding = self.embedding_db.get_embedding(file_path, function_name)
-                if code_embedding is not None:
-                    similarity = util.pytorch_cos_sim(issue_embedding, code_embedding).item()
-                    result_similarity.append([file_path, similarity])
-                    
-                    torch.cuda.empty_cache()
-            except Exception as e:
-                logging.error(f"Error processing {file_path}: {e}")
-                torch.cuda.empty_cache()
+            tuple[list[str], np.ndarray]: The file path of each function and its similarity score, unsorted."""
+        keys = [(file_path, function_name) for file_path, function_name, _ in self.functions_sources]
         
-        function_bar.finish()
-        return sorted(result_similarity, key=lambda x: x[1], reverse=True)
-    
-    
\ No newline at end of file
+        found_keys, code_embeddings = self.embedding_db.get_embedding_matrix(keys)
+        if not found_keys:
+            return [], np.empty(0, dtype=np.float32)
+        
+        issue_embedding = self.models.encode([text_issue])[0]
+        norms = np.linalg.norm(code_embeddings, axis=1) * np.linalg.norm(issue_embedding)
+        similarities = (code_embeddings @ issue_embedding) / np.maximum(norms, 1e-8)
+        return [file_path for file_path, _ in found_keys], similarities
@@ -0,0 +1,133 @@
+import ast
+import logging
+import os
+import re
+import textwrap
+
+from concurrent.futures import ProcessPoolExecutor
+
+# The line breaks counted by `ast`: str.splitlines also breaks on form feeds and other separators, which shifts the line numbers.
+LINE_BREAK = re.compile(r"\r\n|\r|\n")
+
+def extract_function_spans(file_path: str, file_content: str):
+    """Lists the functions defined in a file as compact line spans.
+    
+    This function runs in the worker processes of `FunctionCatalogue`, so it only sends back the qualified names and line numbers:
+    the source of each function is sliced from the file content by the parent process.
+    
+    Args:
+        file_path (str): The path of the file, relative to the repository root.
+        file_content (str): The content of the file.
+    
+    Returns:
+        tuple[str, list]: The file path and a list of (qualified_name, first_line, last_line) tuples, with 1-based inclusive line numbers."""
+    try:
+        parsed_tree = ast.parse(file_content)
+    except SyntaxError:
+        logging.warning(f"Could not parse {file_path}, skipping it")
+        return file_path, []
+    
+    spans = []
+    stack = [(parsed_tree, "")]
+    while stack:
+        node, prefix = stack.pop()
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.ClassDef)):
+                qualified_name = prefix + child.name
+                if isinstance(child, ast.FunctionDef):
+                    spans.append((qualified_name, child.lineno, child.end_lineno))
+                stack.append((child, qualified_name + "."))
+            else:
+                stack.append((child, prefix))
+    return file_path, spans
+
+class FunctionCatalogue:
+    """Catalogue of the Python functions of a repository, kept up to date from one commit to the next.
+    
+    The first refresh parses every Python file of the repository. The next ones only re-parse the files listed as changed
+    since the previous refresh, so the cost of a refresh is proportional to the size of the diff instead of the size of the repository.
+    Files are read through a reader (`WorkTreeReader` or `GitReader` from `interfaces.GitReader`).
+    
+    When at least `parallel_min_files` files have to be parsed, they are fanned out over a pool of `workers` processes with `extract_function_spans`."""
+    
+    def __init__(self, workers: int = None, parallel_min_files: int = None):
+        self.files = None
+        self.workers = workers or int(os.getenv("PARSE_WORKERS", os.cpu_count() or 1))
+        self.parallel_min_files = parallel_min_files or int(os.getenv("PARSE_PARALLEL_MIN_FILES", 64))
+        self.pool = None
+    
+    def refresh(self, reader, sha = None, changed_files: list = None):
+        """Updates the catalogue for the given commit.
+        
+        Args:
+            reader (WorkTreeReader | GitReader): The reader used to list and read the files.
+            sha (str, optional): The commit to read, ignored by `WorkTreeReader`.
+            changed_files (list, optional): The paths, relative to the repository root, of the files changed since the previous refresh.
+                When None, or on the first refresh, the whole repository is parsed.
+        
+        Returns:
+            list: The relative paths of the files that were parsed again or removed."""
+        if self.files is None or changed_files is None:
+            self.files = {}
+            refreshed = to_parse = [file_path for file_path in reader.list_files(sha) if file_path.endswith(".py")]
+        else:
+            refreshed = [file_path for file_path in changed_files if file_path.endswith(".py")]
+            to_parse = [file_path for file_path in refreshed if reader.exists(sha, file_path)]
+            for file_path in set(refreshed) - set(to_parse):
+                self.files.pop(file_path, None)
+        
+        self.files.update(self.__parse_files(reader, sha, to_parse))
+        return refreshed
+    
+    def functions(self):
+        """Lists the functions of the catalogue.
+        
+        Returns:
+            list: A list of (file_path, function_name, source) tuples, file paths being relative to the repository root
+            and function names qualified with their enclosing classes and functions."""
+        return [
+            (file_path, function_name, source)
+            for file_path, functions in self.files.items()
+            for function_name, source in functions
+        ]
+    
+    def __parse_files(self, reader, sha, file_paths):
+        """Extracts the functions of the given files, in parallel when there are enough of them.
+        
+        Args:
+            reader (WorkTreeReader | GitReader): The reader used to read the files.
+            sha (str): The commit to read the files from.
+            file_paths (list): The paths of the files to parse, relative to the repository root.
+        
+        Yields:
+            tuple[str, list]: The file path and its list of (function_name, source) tuples."""
+        contents = {}
+        for file_path in file_paths:
+            try:
+                contents[file_path] = reader.read_file(sha, file_path)
+            except UnicodeDecodeError:
+                logging.warning(f"Could not decode {file_path}, skipping it")
+                contents[file_path] = ""
+        
+        paths, texts = list(contents), list(contents.values())
+        if self.workers > 1 and len(paths) >= self.parallel_min_files:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=self.workers)
+            chunksize = max(1, len(paths) // (self.workers * 4))
+            results = self.pool.map(extract_function_spans, paths, texts, chunksize=chunksize)
+        else:
+            results = map(extract_function_spans, paths, texts)
+        del texts
+        
+        for file_path, spans in results:
+            lines = LINE_BREAK.split(contents.pop(file_path))
+            yield file_path, [
+                (function_name, textwrap.dedent("\n".join(lines[first_line - 1:last_line])))
+                for function_name, first_line, last_line in spans
+            ]
+    
+    def close(self):
+        """Shuts the parsing processes down."""
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
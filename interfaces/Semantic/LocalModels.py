@@ -0,0 +1,86 @@
+import logging
+import os
+import numpy as np
+import torch
+
+from sentence_transformers import SentenceTransformer
+from transformers import AutoModel, AutoTokenizer
+
+CHECKPOINT = "Salesforce/codet5p-220m-bimodal"
+
+class LocalModels:
+    """The models used by CodeT5, loaded in the current process.
+    
+    CodeT5+ bimodal summarizes the source of a function in a few words, and the sentence transformer encodes the summaries and the issues into the same vector space.
+    
+    With the "int8" precision, the linear layers of both models are quantized dynamically (int8 weights, activations quantized on the fly),
+    which only applies on the cpu. The precision is part of `model_ids`, so the cached fp32 and int8 embeddings are never mixed.
+    The intra-op and inter-op thread pools of torch are sized with `TORCH_THREADS` and `TORCH_INTEROP_THREADS` when they are set."""
+    
+    PRECISIONS = ("fp32", "int8")
+    
+    def __init__(self, device: str = None, checkpoint: str = CHECKPOINT, sentence_transformer: str = None, precision: str = None):
+        self.device = device or os.getenv("DEVICE")
+        self.precision = precision or os.getenv("MODEL_PRECISION", "fp32")
+        if self.precision not in self.PRECISIONS:
+            raise ValueError(f"Unknown precision : {self.precision}")
+        if self.precision == "int8" and self.device not in (None, "cpu"):
+            raise ValueError(f"The int8 precision only runs on the cpu, not on {self.device}")
+        self.__set_threads()
+        
+        sentence_transformer = sentence_transformer or os.getenv('SENTENCE_TRANSFORMER')
+        self.model_ids = (checkpoint, sentence_transformer) if self.precision == "fp32" else (checkpoint, sentence_transformer, self.precision)
+        self.tokenizer = AutoTokenizer.from_pretrained(checkpoint, trust_remote_code=True)
+        self.codeT5 = AutoModel.from_pretrained(checkpoint, trust_remote_code=True).to(self.device).eval()
+        self.bert = SentenceTransformer(sentence_transformer, device=self.device)
+        if self.precision == "int8":
+            self.codeT5 = torch.quantization.quantize_dynamic(self.codeT5, {torch.nn.Linear}, dtype=torch.qint8)
+            self.bert = torch.quantization.quantize_dynamic(self.bert, {torch.nn.Linear}, dtype=torch.qint8)
+    
+    @staticmethod
+    def __set_threads():
+        """Sizes the thread pools of torch from the environment. The inter-op pool can only be sized before its first use."""
+        if os.getenv("TORCH_THREADS"):
+            torch.set_num_threads(int(os.getenv("TORCH_THREADS")))
+        if os.getenv("TORCH_INTEROP_THREADS"):
+            try:
+                torch.set_num_interop_threads(int(os.getenv("TORCH_INTEROP_THREADS")))
+            except RuntimeError as e:
+                logging.warning(f"TORCH_INTEROP_THREADS ignored: {e}")
+    
+    def token_lengths(self, sources: list):
+        """Counts the tokens of each source.
+        
+        Args:
+            sources (list[str]): The sources of the functions.
+        
+        Returns:
+            list[int]: The number of tokens of each source."""
+        return [len(ids) for ids in self.tokenizer(sources).input_ids]
+    
+    def summarize(self, sources: list):
+        """Summarizes a batch of functions with one padded `generate` call.
+        
+        Args:
+            sources (list[str]): The sources of the functions.
+        
+        Returns:
+            list[str]: The summary of each function."""
+        encoded = self.tokenizer(sources, padding=True, return_tensors="pt").to(self.device)
+        with torch.inference_mode():
+            generated_ids = self.codeT5.generate(encoded.input_ids, attention_mask=encoded.attention_mask, max_length=20)
+        return self.tokenizer.batch_decode(generated_ids, skip_special_tokens=True)
+    
+    def encode(self, texts: list):
+        """Encodes a batch of texts with the sentence transformer.
+        
+        Args:
+            texts (list[str]): The texts to encode.
+        
+        Returns:
+            np.ndarray: A float32 matrix with one embedding per text."""
+        return self.bert.encode(texts, batch_size=max(len(texts), 1), convert_to_numpy=True, show_progress_bar=False).astype(np.float32)
+    
+    def reset_connections(self):
+        """Nothing to do, the models live in the process."""
+        pass
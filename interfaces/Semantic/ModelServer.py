@@ -0,0 +1,149 @@
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+import traceback
+import numpy as np
+
+from concurrent.futures import Future
+from multiprocessing.connection import Listener
+
+class ModelServer:
+    """Long-lived inference server keeping the models of CodeT5 loaded for every client.
+    
+    Clients (`RemoteModels`) connect through `multiprocessing.connection`, on a TCP or a Unix socket, and send one request at a time.
+    Each connection is served by its own thread, which queues the requests. A single inference thread takes the requests from the queue and
+    coalesces the concurrent `summarize` or `encode` requests into one batch of at most `max_batch` items, waiting up to `max_wait` seconds for
+    more requests to join. The items of a coalesced batch are sorted by length to limit the padding, and the results are split back between the clients."""
+    
+    BATCHED = ("summarize", "encode")
+    
+    def __init__(self, models, address, authkey: bytes, max_batch: int = None, max_wait: float = None):
+        self.models = models
+        self.address = address
+        self.authkey = authkey
+        self.max_batch = max_batch or int(os.getenv("MODEL_SERVER_MAX_BATCH", 64))
+        self.max_wait = max_wait if max_wait is not None else float(os.getenv("MODEL_SERVER_MAX_WAIT_MS", 10)) / 1000
+        self.requests = queue.Queue()
+    
+    def serve_forever(self):
+        """Accepts clients until the process is stopped."""
+        threading.Thread(target=self.__infer, daemon=True).start()
+        self.__remove_stale_socket()
+        with Listener(self.address, authkey=self.authkey) as listener:
+            logging.info(f"Model server listening on {self.address}")
+            while True:
+                try:
+                    connection = listener.accept()
+                except Exception as e:
+                    logging.warning(f"Rejected a model server client: {e}")
+                    continue
+                threading.Thread(target=self.__serve, args=(connection,), daemon=True).start()
+    
+    def __remove_stale_socket(self):
+        """Removes the Unix socket left by a server that was killed, refusing to start when another server still listens on it."""
+        if not isinstance(self.address, str) or not os.path.exists(self.address):
+            return
+        with socket.socket(socket.AF_UNIX) as probe:
+            try:
+                probe.connect(self.address)
+            except ConnectionRefusedError:
+                os.remove(self.address)
+                return
+        raise RuntimeError(f"A model server is already listening on {self.address}")
+    
+    def __serve(self, connection):
+        """Answers the requests of one client until it disconnects."""
+        with connection:
+            while True:
+                try:
+                    method, args = connection.recv()
+                except (EOFError, OSError):
+                    return
+                future = Future()
+                self.requests.put((method, args, future))
+                try:
+                    connection.send(("ok", future.result()))
+                except Exception:
+                    connection.send(("error", traceback.format_exc()))
+    
+    def __infer(self):
+        """Runs the queued requests, coalescing the batched ones.
+        
+        An unexpected error fails the requests taken from the queue instead of stopping the thread, so their clients get an answer."""
+        while True:
+            pending = []
+            try:
+                self.__infer_next(pending)
+            except Exception as e:
+                logging.exception("The model server failed to run a request")
+                for future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+    
+    def __infer_next(self, pending):
+        """Takes the next request from the queue and runs it, with the compatible requests queued meanwhile when it is batched.
+        
+        Args:
+            pending (list): Filled with the futures of the requests being run."""
+        method, args, future = self.requests.get()
+        pending.append(future)
+        if method not in self.BATCHED:
+            self.__run(method, args, future)
+            return
+        
+        batch, deferred = [(args[0], future)], []
+        size, deadline = len(args[0]), time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            try:
+                request = self.requests.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            pending.append(request[2])
+            if request[0] == method and size + len(request[1][0]) <= self.max_batch:
+                batch.append((request[1][0], request[2]))
+                size += len(request[1][0])
+            else:
+                deferred.append(request)
+        for request in deferred:
+            self.requests.put(request)
+            pending.remove(request[2])
+        self.__run_batch(method, batch)
+    
+    def __run(self, method, args, future):
+        try:
+            if method == "model_ids":
+                future.set_result(self.models.model_ids)
+            elif method == "token_lengths":
+                future.set_result(self.models.token_lengths(*args))
+            else:
+                raise ValueError(f"Unknown method : {method}")
+        except Exception as e:
+            future.set_exception(e)
+    
+    def __run_batch(self, method, batch):
+        """Runs one coalesced batch and splits the results between the requests."""
+        try:
+            items = [item for items, _ in batch for item in items]
+            order = sorted(range(len(items)), key=lambda i: len(items[i]))
+            results = getattr(self.models, method)([items[i] for i in order]) if items else []
+            unsorted = [None] * len(items)
+            for position, i in enumerate(order):
+                unsorted[i] = results[position]
+            
+            parts, start = [], 0
+            for items, _ in batch:
+                part = unsorted[start:start + len(items)]
+                if method == "encode":
+                    part = np.stack(part).astype(np.float32) if part else np.empty((0, 0), dtype=np.float32)
+                parts.append(part)
+                start += len(items)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        logging.debug(f"{method}: {len(batch)} requests coalesced into a batch of {len(unsorted)}")
+        for (_, future), part in zip(batch, parts):
+            future.set_result(part)
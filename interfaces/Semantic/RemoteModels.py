@@ -0,0 +1,82 @@
+import os
+import threading
+
+from multiprocessing.connection import Client
+
+def parse_address(address: str):
+    """Converts a `MODEL_SERVER_ADDRESS` value into a `multiprocessing.connection` address.
+    
+    Args:
+        address (str): "host:port" for a TCP socket, or the path of a Unix socket.
+    
+    Returns:
+        tuple[str, int] | str: The address."""
+    host, separator, port = address.rpartition(":")
+    if separator and port.isdigit() and "/" not in address:
+        return (host or "localhost", int(port))
+    return address
+
+def server_address():
+    """Reads the address of the model server from `MODEL_SERVER_ADDRESS`.
+    
+    Returns:
+        tuple[str, int] | str: The address."""
+    return parse_address(os.getenv("MODEL_SERVER_ADDRESS", "localhost:6150"))
+
+def server_authkey():
+    """Reads the authentication key of the model server from `MODEL_SERVER_AUTHKEY`.
+    
+    The requests are pickled, so anyone knowing the key can run code in the server and its clients: there is no default key.
+    
+    Returns:
+        bytes: The authentication key.
+    
+    Raises:
+        RuntimeError: If `MODEL_SERVER_AUTHKEY` is not set."""
+    authkey = os.getenv("MODEL_SERVER_AUTHKEY", "")
+    if not authkey:
+        raise RuntimeError("MODEL_SERVER_AUTHKEY must be set to a secret shared by the model server and its clients")
+    return authkey.encode()
+
+class RemoteModels:
+    """Client of a `ModelServer`, with the same interface as `LocalModels`.
+    
+    The models stay loaded in the server, so a run does not load them again. The connection is opened on the first call,
+    and opened again in a forked process, since a connection cannot be shared between processes."""
+    
+    def __init__(self, address = None, authkey: bytes = None):
+        self.address = parse_address(address) if isinstance(address, str) else address or server_address()
+        self.authkey = authkey or server_authkey()
+        self.connection = None
+        self.pid = None
+        self.lock = threading.Lock()
+        self.model_ids = tuple(self.__call("model_ids"))
+    
+    def __call(self, method: str, *args):
+        """Sends one request to the server and waits for its answer.
+        
+        Raises:
+            RuntimeError: If the server failed to run the request."""
+        with self.lock:
+            if self.connection is None or self.pid != os.getpid():
+                self.connection = Client(self.address, authkey=self.authkey)
+                self.pid = os.getpid()
+            self.connection.send((method, args))
+            status, result = self.connection.recv()
+        if status != "ok":
+            raise RuntimeError(f"The model server failed to run {method}:\n{result}")
+        return result
+    
+    def token_lengths(self, sources: list):
+        return self.__call("token_lengths", sources)
+    
+    def summarize(self, sources: list):
+        return self.__call("summarize", sources)
+    
+    def encode(self, texts: list):
+        return self.__call("encode", texts)
+    
+    def reset_connections(self):
+        """Forgets the connection inherited from the parent process, a new one is opened on the next call."""
+        self.connection = None
+        self.pid = None
@@ -3,9 +3,29 @@ from abc import ABC, abstractmethod
 class SemanticTest(ABC):
     
     @abstractmethod
-    def get_max_file_score_from_issue(self, text_issue : str):
+    def get_max_file_score_from_issue(self, text_issue : str, recompute_files : list = None, sha : str = None):
         raise NotImplementedError()
     
+    @abstractmethod
+    def prepare(self, recompute_files : list = None, sha : str = None):
+        raise NotImplementedError()
+    
+    @abstractmethod
+    def score(self, text_issue : str, k : int = None):
+        raise NotImplementedError()
+    
+    def init_worker(self):
+        """Adapts a backend initialized with `init_repo` to run in a worker process of the parallel semantic test, after the fork. Backends without shared state ignore it."""
+        pass
+    
+    def drain_cache(self):
+        """Returns the cache writes buffered by a worker process since the previous call, to be applied by the calling process with `save_cache`. Backends without a cache return None."""
+        return None
+    
+    def save_cache(self, drained: list):
+        """Applies the cache writes returned by the `drain_cache` calls of the worker processes. Backends without a cache ignore it."""
+        pass
+    
     @abstractmethod
     def init_repo(self, repoFullName: str):
         raise NotImplementedError()
\ No newline at end of file
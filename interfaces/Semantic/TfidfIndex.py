@@ -0,0 +1,113 @@
+import json
+import os
+import pickle
+import numpy as np
+import scipy.sparse as sp
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+class TfidfIndex:
+    """Corpus-level TF-IDF index of the files of a repository, used by Algorithmic.
+    
+    One `TfidfVectorizer` is fitted over the transformed text of every file and the sparse document-term matrix is kept,
+    so an issue is scored against every file with a single sparse matrix-vector product.
+    The index is saved in `path` and updated incrementally: changed files are re-vectorized with the fitted vocabulary,
+    and the vectorizer is fitted again once the changed files exceed `refit_ratio` of the corpus."""
+    
+    def __init__(self, path: str, refit_ratio: float = None, autosave: bool = True):
+        self.path = path
+        self.autosave = autosave
+        self.refit_ratio = refit_ratio if refit_ratio is not None else float(os.getenv("TFIDF_REFIT_RATIO", 0.2))
+        self.vectorizer = None
+        self.matrix = None
+        self.paths = []
+        self.docs = {}
+        self.stale = 0
+        self.__load()
+    
+    def __load(self):
+        """Loads the index saved in `self.path`, if any."""
+        docs_path = os.path.join(self.path, "docs.json")
+        if not os.path.exists(docs_path):
+            return
+        with open(docs_path, encoding="utf-8") as f:
+            saved = json.load(f)
+        with open(os.path.join(self.path, "vectorizer.pkl"), "rb") as f:
+            self.vectorizer = pickle.load(f)
+        matrix_path = os.path.join(self.path, "matrix.npz")
+        self.matrix = sp.load_npz(matrix_path) if os.path.exists(matrix_path) else None
+        self.paths = saved["paths"]
+        self.docs = saved["docs"]
+        self.stale = saved["stale"]
+    
+    def save(self):
+        """Writes the vectorizer, the document-term matrix and the documents to `self.path`."""
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, "vectorizer.pkl"), "wb") as f:
+            pickle.dump(self.vectorizer, f)
+        matrix_path = os.path.join(self.path, "matrix.npz")
+        if self.matrix is not None:
+            sp.save_npz(matrix_path, self.matrix)
+        elif os.path.exists(matrix_path):
+            os.remove(matrix_path)
+        with open(os.path.join(self.path, "docs.json"), "w", encoding="utf-8") as f:
+            json.dump({"paths": self.paths, "docs": self.docs, "stale": self.stale}, f)
+    
+    def __contains__(self, file_path):
+        return file_path in self.docs
+    
+    def update(self, texts: dict, removed = ()):
+        """Adds or replaces the text of some files and removes others, then saves the index unless `autosave` is off.
+        
+        Args:
+            texts (dict): The new transformed text of the added or changed files, by file path.
+            removed (iterable): The paths of the files to remove from the index."""
+        removed = set(removed)
+        if not texts and not removed:
+            return
+        for file_path in removed:
+            self.docs.pop(file_path, None)
+        self.docs.update(texts)
+        self.stale += len(texts) + len(removed)
+        
+        if self.vectorizer is None or self.stale > self.refit_ratio * len(self.docs):
+            self.__fit()
+        else:
+            keep = [i for i, file_path in enumerate(self.paths) if file_path not in texts and file_path not in removed]
+            self.matrix = sp.vstack([self.matrix[keep], self.vectorizer.transform(list(texts.values()))], format="csr")
+            self.paths = [self.paths[i] for i in keep] + list(texts)
+        if self.autosave:
+            self.save()
+    
+    def __fit(self):
+        """Fits the vectorizer on the whole corpus.
+        
+        When the corpus has no term at all (no file, or only empty texts), the index is left empty and fitted again on the next update."""
+        self.paths = list(self.docs)
+        self.vectorizer = TfidfVectorizer(dtype=np.float32)
+        try:
+            self.matrix = self.vectorizer.fit_transform([self.docs[file_path] for file_path in self.paths]).tocsr()
+        except ValueError:
+            self.vectorizer, self.matrix, self.paths = None, None, []
+        self.stale = 0
+    
+    def score(self, text: str):
+        """Computes the cosine similarity between a text and every file of the index.
+        
+        The rows of the document-term matrix are L2-normalized by the vectorizer, so the similarities are a single sparse product.
+        
+        Args:
+            text (str): The text to compare against the files.
+        
+        Returns:
+            tuple[list, np.ndarray]: The file paths and their similarity scores."""
+        if self.matrix is None or not self.paths:
+            return [], np.empty(0, dtype=np.float32)
+        query = self.vectorizer.transform([text])
+        return self.paths, np.asarray((self.matrix @ query.T).todense()).ravel()
+    
+    def clean(self):
+        """Removes the saved index."""
+        for name in ("vectorizer.pkl", "matrix.npz", "docs.json"):
+            if os.path.exists(os.path.join(self.path, name)):
+                os.remove(os.path.join(self.path, name))
@@ -8,20 +8,21 @@ from github import Github, Auth
 from rich.table import Table
 from rich.console import Console
 from progress.bar import IncrementalBar
-from interfaces.Database.EmbeddingT5 import EmbeddingT5
-from interfaces.Database.EmbeddingAlg import EmbeddingAlg
-from interfaces.Semantic.CodeT5 import CodeT5
-from interfaces.Semantic.Algorithmic import Algorithmic
 from interfaces.Database.SQLite import SQLite
+from interfaces.Database.FileIdResolver import FileIdResolver
 from interfaces.GithubFactory import GithubFactory
-from utils.containers import Container, providers
+from interfaces.GitReader import GitReader
+from interfaces.ParallelTester import ParallelTester
+from interfaces.GithubCache import GithubResponseCache, install_response_cache
+from utils.containers import Container, lazy, providers
 from dependency_injector.wiring import inject
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import ArgumentError
-from models.testResult import TestResult
-from models.db import setup_db
+from models.db import configure_engine, setup_db
 from timeit import default_timer
 from utils.missingFileException import MissingFileException
+from utils.workPlan import issue_text, plan_commits
+from utils.rankings import encode_ranking
 
 logging.basicConfig(filename='logs.log', level=logging.DEBUG)
 
@@ -34,9 +35,12 @@ def __configure_session(container: Container):
     - SQLite database interface
     - GitHub API factory
     - Semantic code analysis components (CodeT5, Algorithmic)
-    - Embedding components (EmbeddingT5, EmbeddingAlg)
+    - Content-addressed embedding cache (EmbeddingCache)
+    - Embedding components (EmbeddingIndex, EmbeddingPacked, EmbeddingT5, EmbeddingPackedAlg, EmbeddingAlg)
 
-    The function uses environment variables to retrieve the SQLite database path and GitHub API token. It also sets up the database schema using the `setup_db` function.
+    The function uses environment variables to retrieve the SQLite database path and GitHub API token. When `GITHUB_CACHE_PATH` is set, the GitHub responses go through an on-disk cache. It also sets up the database schema using the `setup_db` function.
+
+    The semantic and embedding components are named with `lazy`, so their modules (and the models, torch, transformers, nltk or sklearn they need) are only imported when a command builds them.
 
     The configured container is then returned, allowing the application to use the various components through dependency injection.
     """
@@ -46,10 +50,14 @@ def __configure_session(container: Container):
     except ArgumentError as e:
         raise (f"Error from sqlalchemy : {str(e)}")
     
+    configure_engine(engine)
     Session = sessionmaker()
     Session.configure(bind=engine)
     setup_db(engine)
     
+    if os.getenv("GITHUB_CACHE_PATH"):
+        install_response_cache(GithubResponseCache())
+    
     container.session.override(
         providers.Singleton(Session)
     )
@@ -62,18 +70,19 @@ def __configure_session(container: Container):
     container.git_factory.override(
         providers.Factory(
             GithubFactory,
-            g = Github(auth=Auth.Token(os.getenv('GITHUB_TOKEN'))),
+            g = Github(base_url=os.getenv('GITHUB_API_URL', 'https://api.github.com'), auth=Auth.Token(os.getenv('GITHUB_TOKEN'))),
             db = container.db_interface
         )
     )
     container.semantic_test.override(
         providers.Factory(
-            CodeT5 # CodeT5, Algorithmic or AIGEN (AIGEN not implemented yet)
+            lazy("interfaces.Semantic.CodeT5:CodeT5"), # CodeT5, Algorithmic or AIGEN (AIGEN not implemented yet)
+            cache = container.embedding_cache
         )
     )
     container.db_embedding.override(
         providers.Singleton(
-            EmbeddingT5 # EmbeddingT5, EmbeddingAlg or EmbeddingGen (EmbeddingGen not implemented yet)
+            lazy("interfaces.Database.EmbeddingIndex:EmbeddingIndex") # EmbeddingIndex, EmbeddingPacked or EmbeddingT5 for CodeT5, EmbeddingPackedAlg or EmbeddingAlg for Algorithmic, EmbeddingGen (EmbeddingGen not implemented yet)
         )
     )
 
@@ -111,83 +120,198 @@ def find_repo(min_stars, lang, nb_repo):
 
 @click.command()
 @click.option('--repository_name', envvar='REPOSITORY_NAME', default=os.getenv('REPOSITORY_NAME'), help='Name of the repository')
+@click.option('--full', is_flag=True, default=False, help='Ignore the last checkpoint and search every pull request again')
 @inject
-def get_data_repo(repository_name):
+def get_data_repo(repository_name, full):
     """Fetches and stores data for a given GitHub repository.
 
     Iterates through the pull  and pull requests for the repository, 
     fetching additional data like comments and modified files. Stores all
     the data in a local SQLite database for later analysis.
+    
+    The synchronisation is incremental: only the pull requests updated since the last checkpoint are searched,
+    rows already in the database are skipped, and the checkpoint is moved forward after each pull request,
+    so an interrupted run resumes where it stopped. Each pull request, with its issue, comments, modified files
+    and checkpoint, is written as one transaction; SQLITE_BATCH_SIZE transactions are grouped per commit.
 
     Parameters:
-        repository_name: The name of the GitHub repository to fetch data for."""
-    
-    j = -1
-    sqlite.insert(githubFactory.get_repository(repository_name))
-    sqlite.insert_many(list(githubFactory.get_gitFiles()))
-    
-    pullList, pulls, issueNumbers = githubFactory.get_pull_requests()
-    bar = IncrementalBar("Fetching data", max = len(issueNumbers))
-    for pull, pullItem, issueNumber in zip(pulls, pullList, issueNumbers):
-        j += 1
-        bar.next()
-        issue, issueItem = githubFactory.get_issue(issueNumber)
-        if issue == 0 and issueItem == 0:
-            continue
-        newPullId = sqlite.insert(pullItem)
-        newIssueId = sqlite.insert(issueItem)
-        sqlite.update_issueId_pullRequest(pullItem.githubId, newIssueId)
-        sqlite.insert_many(list(githubFactory.get_comments(issue, newIssueId)))
-        sqlite.insert_many(list(githubFactory.get_modified_files(pull, newPullId)))
-        logging.info("Committed data for issue: " + str(pullItem.issueId))
+        repository_name: The name of the GitHub repository to fetch data for.
+        full: Whether to ignore the last checkpoint."""
     
+    repository = githubFactory.get_repository(repository_name)
+    if not sqlite.repository_exists(repository.id):
+        sqlite.insert(repository)
+    githubFactory.get_file_resolver().add_missing(githubFactory.get_gitFiles(f"./test/{repository_name.split('/')[-1]}"))
+    
+    syncState = sqlite.get_sync_state(repository.id)
+    since = None if full or syncState is None else syncState.lastUpdatedAt
+    ingestedPulls = sqlite.get_ingested_pulls(repository.id)
+    
+    pullList, pulls, issueNumbers = githubFactory.get_pull_requests(since)
+    bar = IncrementalBar("Fetching data", max = len(pulls))
+    pullData = githubFactory.fetch_pull_data(pulls, issueNumbers)
+    ingest_pull_data(sqlite, githubFactory, repository.id, pulls, pullList, pullData, ingestedPulls, bar)
     bar.finish()
 
+def ingest_pull_data(sqlite, githubFactory, repositoryId, pulls, pullList, pullData, ingestedPulls, bar = None):
+    """Stores the pull requests fetched by `get_pull_requests` and `fetch_pull_data`.
+
+    Each pull request, with its issue, comments, modified files and checkpoint, is written as one transaction.
+    For a pull request already in the database, only its new comments are stored.
+
+    Parameters:
+        sqlite: The database interface.
+        githubFactory: The GitHub factory the data was fetched with.
+        repositoryId: The ID of the repository.
+        pulls, pullList, pullData: The Github pull requests, their PullRequest objects and their (issue, issueItem, comments, files) data.
+        ingestedPulls: The (pullId, issueId) of the pull requests already stored, by GitHub ID. It is updated with the new ones.
+        bar (optional): A progress bar moved forward for each pull request."""
+    
+    for pull, pullItem, (issue, issueItem, comments, files) in zip(pulls, pullList, pullData):
+        if bar is not None:
+            bar.next()
+        with sqlite.transaction():
+            if issue != 0 or issueItem != 0:
+                if pullItem.githubId in ingestedPulls:
+                    _, issueId = ingestedPulls[pullItem.githubId]
+                    knownComments = sqlite.get_comment_ids(issueId)
+                    sqlite.insert_many([comment for comment in githubFactory.get_comments(issue, issueId, comments) if comment.githubId not in knownComments])
+                else:
+                    newPullId = sqlite.insert(pullItem)
+                    newIssueId = sqlite.insert(issueItem)
+                    sqlite.update_issueId_pullRequest(pullItem.githubId, newIssueId)
+                    sqlite.insert_many(list(githubFactory.get_comments(issue, newIssueId, comments)))
+                    sqlite.insert_many(list(githubFactory.get_modified_files(pull, newPullId, files)))
+                    ingestedPulls[pullItem.githubId] = (newPullId, newIssueId)
+                logging.info("Committed data for issue: " + str(pullItem.issueId))
+            sqlite.save_sync_state(repositoryId, pull.updated_at.replace(tzinfo=None), pull.id)
+    
+    sqlite.commit_pending()
+
 @click.command()
 @click.option('--repository_name', envvar='REPOSITORY_NAME', default=os.getenv('REPOSITORY_NAME'), help='Name of the repository')
 @click.option('--nb_result', envvar='NB_RESULT', default=os.getenv('NB_RESULT'), help='Number of results to return')
+@click.option('--workers', envvar='SEMANTIC_WORKERS', default=1, help='Number of worker processes testing commits in parallel')
 @inject
-def semantic_test_repo(repository_name, nb_result):
+def semantic_test_repo(repository_name, nb_result, workers):
     """Runs a semantic test on a given GitHub repository.
 
-    This function retrieves the text and SHA values for each issue in the specified repository, and then performs a semantic test on the code changes associated with each issue.
-    The results of the test are stored in a SQLite database.
+    This function retrieves the text and SHA values of the issues of the specified repository that have not been tested yet, and then performs a semantic test on the code changes associated with each issue.
+    The issues are grouped by base commit (see `utils.workPlan.plan_commits`): each commit is prepared once, in commit time order, and all its issues are scored against it.
+    The function scores are aggregated per file (`RANK_AGGREGATION`, maximum over the functions of the file by default) and only the best files are selected. The `RESULTS_TOP_K` best files of each issue are stored in the testResultRank table,
+    and the full file ranking is also packed into the testResult row when `RESULTS_STORE_FULL` is set.
 
     Parameters:
         repository_name (str): The name of the GitHub repository to test.
         nb_result (int): The number of top results to display for each issue.
+        workers (int): The number of worker processes. With more than one, the commits are tested in parallel by a `ParallelTester`,
+            this process being the only one writing the results and the embeddings.
 
     Returns:
         None"""
     
-    text_and_shas = sqlite.get_shas_texts_and_issueId(repository_name)
-    path = semantic.init_repo(repository_name, embedding)
+    semantic = container.semantic_test()
+    embedding = container.db_embedding()
+    issues = sqlite.get_pending_issues(repository_name)
+    repo_path = semantic.init_repo(repository_name, embedding)
+    fileResolver = FileIdResolver(sqlite, sqlite.get_repoId_from_repoName(repository_name))
+    top_k = int(os.getenv("RESULTS_TOP_K", 100))
+    store_full = os.getenv("RESULTS_STORE_FULL", "false").lower() in ("1", "true", "yes")
+    k = None if store_full else max(top_k, int(nb_result))
     
-    for title, body, sha, issueId in text_and_shas:
-        if sqlite.issue_exists(issueId):
-            logging.info(f"Issue {issueId} has already been treated. Skipping...")
-            continue
-        
-        start = default_timer()
-        file_diff = githubFactory.setup_repo(sha, repository_name, path)
-        results = semantic.get_max_file_score_from_issue(title.join(', ' + body), file_diff)
-        
-        for i in range(int(nb_result)):
+    githubFactory.clone_repo(repository_name, repo_path)
+    reader = GitReader(repo_path)
+    plan = plan_commits(issues, reader.commit_times({sha for _, _, sha, _ in issues}))
+    reader.close()
+    logging.info(f"{sum(len(group) for _, group in plan)} issues to test over {len(plan)} commits")
+    
+    def store_result(issueId, results):
+        for i in range(min(int(nb_result), len(results))):
             print(f"the {i+1} result is {results[i][0]} with a score of {results[i][1]}")
         
-        for result in results:
+        ranking = []
+        for file_path, score in results:
             try:
-                fileId = sqlite.get_file_id_by_filename(result[0], sqlite.get_repoId_from_repoName(repository_name))
-                result[0] = fileId
+                ranking.append((fileResolver.get(file_path), score))
             except MissingFileException:
-                logging.warning(f"No file found with name {result[0]} in repo {repository_name}")
-                fileId = 0
+                logging.warning(f"No file found with name {file_path} in repo {repository_name}")
+        
+        full_ranking = encode_ranking(*zip(*ranking)) if store_full and ranking else None
+        sqlite.insert_test_result(issueId, ranking[:top_k], full_ranking)
+    
+    if int(workers) > 1:
+        start = default_timer()
+        computed, cache_writes = {}, []
+        for event in ParallelTester(int(workers)).run(semantic, embedding, repository_name, repo_path, plan, k):
+            if event[0] == "result":
+                store_result(event[1], event[2])
+            else:
+                for row in event[2]:
+                    if computed.get(row[:2], (-1,))[0] < event[1]:
+                        computed[row[:2]] = (event[1], row)
+                if event[3]:
+                    cache_writes.append(event[3])
+        embedding.save_many([row for _, row in computed.values()])
+        embedding.flush()
+        semantic.save_cache(cache_writes)
+        logging.info(f"duration of the parallel test: {default_timer() - start}")
+        return
+    
+    for sha, group in plan:
+        start = default_timer()
+        file_diff = githubFactory.setup_repo(sha, repository_name, repo_path, checkout = False)
+        semantic.prepare(file_diff, sha)
+        logging.info(f"duration of the preparation of {sha}: {default_timer() - start}")
         
-        testResult = TestResult(issueId = issueId, results_array = str(results))
-        sqlite.insert(testResult)
-        end = default_timer()
-        logging.info(f"duration of the test: {end - start}")
+        for title, body, issueId in group:
+            start = default_timer()
+            store_result(issueId, semantic.score(issue_text(title, body), k))
+            end = default_timer()
+            logging.info(f"duration of the test: {end - start}")
     
+@click.command()
+@click.option('--address', envvar='MODEL_SERVER_ADDRESS', default='localhost:6150', help='host:port or path of a Unix socket to listen on')
+@inject
+def model_server(address):
+    """Keeps the models of CodeT5 loaded and serves them to the other commands.
+
+    The models are loaded once, then every `semantic-test-repo` run with `MODEL_BACKEND=remote` uses them through the server
+    instead of loading them again. The concurrent requests of several clients are coalesced into larger batches
+    (`MODEL_SERVER_MAX_BATCH` items, waiting at most `MODEL_SERVER_MAX_WAIT_MS`).
+
+    Parameters:
+        address (str): The address to listen on."""
+    
+    from interfaces.Semantic.LocalModels import LocalModels
+    from interfaces.Semantic.ModelServer import ModelServer
+    from interfaces.Semantic.RemoteModels import parse_address, server_authkey
+    
+    authkey = server_authkey()
+    ModelServer(LocalModels(), parse_address(address), authkey).serve_forever()
+
+@click.command()
+@inject
+def db_stats():
+    """Reports the size of every table of the database and the query plans of the main lookups.
+
+    Prints a table with the row count of each table, then the EXPLAIN QUERY PLAN of each lookup,
+    to check that the lookups use the indexes instead of scanning the tables."""
+
+    console = Console()
+    table = Table(title="Tables")
+    for column in ["Table", "Rows"]:
+        table.add_column(column, justify="center")
+    for name, count in sqlite.get_table_sizes():
+        table.add_row(name, str(count))
+    console.print(table)
+    
+    plans = Table(title="Query plans")
+    for column in ["Lookup", "Plan"]:
+        plans.add_column(column)
+    for name, plan in sqlite.get_query_plans():
+        plans.add_row(name, "\n".join(plan))
+    console.print(plans)
+
 @click.command()
 @inject
 def test():
@@ -227,11 +351,13 @@ def test():
         else:
             print("No error detected")
     
-    embedding.clean()
+    container.db_embedding().clean()
 
 cli.add_command(semantic_test_repo)
 cli.add_command(get_data_repo)
 cli.add_command(find_repo)
+cli.add_command(model_server)
+cli.add_command(db_stats)
 cli.add_command(test)
 
 if __name__ == "__main__":
@@ -240,8 +366,6 @@ if __name__ == "__main__":
     
     sqlite = container.db_interface()
     githubFactory = container.git_factory()
-    semantic = container.semantic_test()
-    embedding = container.db_embedding()
     
     cli()
 
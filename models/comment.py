@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Index, Integer, String, ForeignKey
 from models.db import Base
 
 class Comment(Base) :
     __tablename__ = "comment"
+    __table_args__ = (
+        Index("ix_comment_issueId", "issueId"),
+        Index("ix_comment_githubId", "githubId"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     githubId = Column(Integer)
@@ -1,6 +1,25 @@
+import os
+
+from sqlalchemy import event
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
 
+def configure_engine(engine):
+    """Sets the SQLite pragmas used for bulk ingestion on every new connection of the engine:
+    WAL journal, NORMAL synchronous mode (no fsync on each commit, only at checkpoints), a larger page cache and in-memory temporary tables."""
+    
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA cache_size=-{int(os.getenv('SQLITE_CACHE_KB', 65536))}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
 def setup_db(engine):
-    Base.metadata.create_all(engine)
\ No newline at end of file
+    """Creates the missing tables, then brings an existing database up to date with `models.migrations`."""
+    from models.migrations import migrate
+    Base.metadata.create_all(engine)
+    migrate(engine, Base.metadata)
\ No newline at end of file
@@ -1,8 +1,11 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Index, Integer, String, ForeignKey
 from models.db import Base
 
 class GitFile(Base):
     __tablename__ = "gitFile"
+    __table_args__ = (
+        Index("ux_gitFile_repositoryId_fileName", "repositoryId", "fileName", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     sha = Column(String)
@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Index, Integer, String, ForeignKey
 from models.db import Base
 
 class Issue(Base) :
     __tablename__ = "issue"
+    __table_args__ = (
+        Index("ix_issue_githubId", "githubId"),
+        Index("ix_issue_repositoryId", "repositoryId"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     githubId = Column(Integer)
@@ -0,0 +1,53 @@
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+def add_indexes(engine, metadata):
+    """Creates the secondary indexes declared on the models that an existing database does not have yet.
+    
+    A unique index that cannot be built because the table already holds duplicates is created as a plain index instead, and a warning is logged."""
+    for table in metadata.sorted_tables:
+        for index in list(table.indexes):
+            try:
+                with engine.begin() as conn:
+                    index.create(conn, checkfirst=True)
+            except IntegrityError:
+                logging.warning(f"Duplicates in {table.name} prevent the unique index {index.name}, creating it as a non-unique index")
+                columns = ", ".join(f'"{column.name}"' for column in index.columns)
+                with engine.begin() as conn:
+                    conn.execute(text(f'CREATE INDEX IF NOT EXISTS "{index.name}" ON "{table.name}" ({columns})'))
+
+def add_ranking_column(engine, metadata):
+    """Adds the packed `ranking` column to a testResult table created before it existed."""
+    with engine.begin() as conn:
+        columns = [row[1] for row in conn.execute(text("PRAGMA table_info(testResult)"))]
+        if "ranking" not in columns:
+            conn.execute(text("ALTER TABLE testResult ADD COLUMN ranking BLOB"))
+
+MIGRATIONS = [
+    (1, "Add secondary and unique indexes", add_indexes),
+    (2, "Add the packed ranking of the test results", add_ranking_column),
+]
+
+def get_version(engine):
+    """Reads the schema version stored in the SQLite `user_version` pragma."""
+    with engine.connect() as conn:
+        return conn.execute(text("PRAGMA user_version")).scalar()
+
+def migrate(engine, metadata):
+    """Applies the migrations newer than the schema version of the database, then stores the new version.
+    
+    Every migration must be idempotent, since a database created by `setup_db` already has the latest schema but starts at version 0.
+    
+    Parameters:
+        engine: The SQLAlchemy engine of the database.
+        metadata: The metadata of the models."""
+    version = get_version(engine)
+    for number, description, migration in MIGRATIONS:
+        if number <= version:
+            continue
+        logging.info(f"Applying migration {number}: {description}")
+        migration(engine, metadata)
+        with engine.begin() as conn:
+            conn.execute(text(f"PRAGMA user_version = {int(number)}"))
@@ -1,8 +1,11 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Index, Integer, String, ForeignKey
 from models.db import Base
 
 class ModifiedFiles(Base) :
     __tablename__ = "modifiedFiles"
+    __table_args__ = (
+        Index("ix_modifiedFiles_pullRequestId", "pullRequestId"),
+    )
     
     gitFileId = Column(Integer, ForeignKey("gitFile.id"), primary_key=True)
     pullRequestId = Column(Integer, ForeignKey("pullRequest.id"), primary_key=True)
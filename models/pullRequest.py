@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Index, Integer, String, DateTime, ForeignKey
 from models.db import Base
 
 class PullRequest(Base) :
     __tablename__ = "pullRequest"
+    __table_args__ = (
+        Index("ix_pullRequest_githubId", "githubId"),
+        Index("ix_pullRequest_issueId", "issueId"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     githubId = Column(Integer)
@@ -1,8 +1,11 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Index, Integer, String
 from models.db import Base
 
 class Repository(Base) :
     __tablename__ = "repository"
+    __table_args__ = (
+        Index("ux_repository_fullName", "fullName", unique=True),
+    )
     
     id = Column(Integer, primary_key=True)
     fullName = Column(String)
@@ -0,0 +1,9 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from models.db import Base
+
+class SyncState(Base) :
+    __tablename__ = "syncState"
+    
+    repositoryId = Column(Integer, ForeignKey("repository.id"), primary_key=True)
+    lastUpdatedAt = Column(DateTime)
+    lastPullGithubId = Column(Integer)
@@ -1,9 +1,13 @@
-from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy import Column, ForeignKey, Index, Integer, LargeBinary, String
 from models.db import Base
 
 class TestResult(Base) :
     __tablename__ = "testResult"
+    __table_args__ = (
+        Index("ix_testResult_issueId", "issueId"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     issueId = Column(Integer, ForeignKey("issue.id"))
-    results_array = Column(String)
\ No newline at end of file
+    results_array = Column(String)
+    ranking = Column(LargeBinary)
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Float, ForeignKey, Index, Integer
+from models.db import Base
+
+class TestResultRank(Base) :
+    __tablename__ = "testResultRank"
+    __table_args__ = (
+        Index("ix_testResultRank_gitFileId", "gitFileId"),
+    )
+    
+    issueId = Column(Integer, ForeignKey("issue.id"), primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    gitFileId = Column(Integer, ForeignKey("gitFile.id"))
+    score = Column(Float)
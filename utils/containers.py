@@ -1,11 +1,34 @@
+import importlib
+
 from dependency_injector import containers, providers
 from interfaces.AbcFactoryGit import AbcFactoryGit
 from interfaces.Semantic.SemanticTest import SemanticTest
 from interfaces.Database.DbInterface import DbInterface
 from interfaces.Database.EmbeddingDbI import EmbeddingDbI
+from interfaces.Database.EmbeddingCache import EmbeddingCache
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 
+def lazy(path: str):
+    """Names a class or function without importing its module, for the providers of components with heavy dependencies.
+    
+    Args:
+        path (str): The "module:attribute" path of the class or function.
+    
+    Returns:
+        callable: A callable that imports the module on its first call and forwards its arguments to the attribute."""
+    module_name, attribute = path.split(":")
+    target = None
+    
+    def build(*args, **kwargs):
+        nonlocal target
+        if target is None:
+            target = getattr(importlib.import_module(module_name), attribute)
+        return target(*args, **kwargs)
+    
+    build.__qualname__ = build.__name__ = attribute
+    return build
+
 class Container(containers.DeclarativeContainer):
     load_dotenv()
     Session = sessionmaker()
@@ -14,4 +37,5 @@ class Container(containers.DeclarativeContainer):
     git_factory = providers.AbstractFactory(AbcFactoryGit)
     db_interface = providers.AbstractSingleton(DbInterface)
     semantic_test = providers.AbstractFactory(SemanticTest)
-    db_embedding = providers.AbstractSingleton(EmbeddingDbI)
\ No newline at end of file
+    db_embedding = providers.AbstractSingleton(EmbeddingDbI)
+    embedding_cache = providers.Singleton(EmbeddingCache)
\ No newline at end of file
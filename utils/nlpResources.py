@@ -0,0 +1,90 @@
+"""Process-wide NLP resources used by Algorithmic.
+
+Every resource is loaded once per process on first use, and the per-word lookups are memoized with bounded LRU caches,
+since the same identifiers and acronyms come back in almost every file of a repository."""
+import os
+import re
+import nltk
+
+from functools import lru_cache
+from pygments.token import Token
+
+CACHE_SIZE = int(os.getenv("NLP_CACHE_SIZE", 65536))
+
+COMMENT_TOKENS = frozenset({Token.Literal.String.Doc, Token.Comment.Single, Token.Comment.Multiline})
+NAME_TOKENS = frozenset({Token.Name.Function, Token.Name})
+STRING_TOKEN = Token.Literal.String.Single
+IGNORED_STRINGS = frozenset({"'", ':', ';'})
+
+ACRONYM_PATTERN = re.compile(r'\b[A-Z]+\b')
+WORD_PATTERN = re.compile(r'[A-Za-z]+')
+
+@lru_cache(maxsize=None)
+def ensure_corpora():
+    """Downloads the nltk corpora used by Algorithmic if they are missing."""
+    try:
+        nltk.data.find('corpora/wordnet.zip')
+        nltk.data.find('corpora/words.zip')
+    except LookupError:
+        nltk.download('wordnet')
+        nltk.download('words')
+
+@lru_cache(maxsize=None)
+def english_words():
+    """Returns the nltk list of English words as a frozenset, built once per process."""
+    from nltk.corpus import words
+    return frozenset(words.words())
+
+@lru_cache(maxsize=None)
+def speller():
+    """Returns the shared autocorrect `Speller`, built once per process."""
+    from autocorrect import Speller
+    return Speller()
+
+@lru_cache(maxsize=CACHE_SIZE)
+def expand_acronym(acronym: str):
+    """Finds the expansion of an acronym with WordNet: the first lemma of the first hypernym of its first synset.
+    
+    Args:
+        acronym (str): The acronym to expand.
+    
+    Returns:
+        str or None: The expansion, or None if WordNet has none."""
+    from nltk.corpus import wordnet
+    synsets = wordnet.synsets(acronym)
+    if synsets:
+        hypernyms = synsets[0].hypernyms()
+        if hypernyms:
+            return hypernyms[0].lemmas()[0].name().replace('_', ' ')
+    return None
+
+@lru_cache(maxsize=CACHE_SIZE)
+def correct_word(word: str):
+    """Returns the spelling correction of a single word."""
+    return speller().autocorrect_word(word)
+
+def correct_text(text: str):
+    """Corrects the spelling of every word of a text, like calling the `Speller` on the whole text, but with memoized words.
+    
+    Args:
+        text (str): The text to correct.
+    
+    Returns:
+        str: The corrected text."""
+    return WORD_PATTERN.sub(lambda match: correct_word(match.group(0)), text)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def split_identifier(s: str):
+    """Splits an identifier into different words, e.g.:
+        thisIsMyVariable => "this is my variable"
+        this_is_my_variable => "this is my variable"
+    
+    Args:
+        s (str): The identifier to split.
+    
+    Returns:
+        str: The identifier split into individual words."""
+    modified_string = list(map(lambda x: '_' + x if x.isupper() else x, s))
+    split_string = ''.join(modified_string).split('_')
+    split_string = list(filter(lambda x: x != '', split_string))
+    return " ".join(split_string)
@@ -0,0 +1,76 @@
+import os
+import struct
+import numpy as np
+
+RANKING_HEADER = struct.Struct("<4sI")
+RANKING_CODE = b"i4f4"
+
+def rank_files(paths, scores, k: int = None, how: str = None):
+    """Aggregates scores into one score per file and selects the best files.
+    
+    The paths are factorized into integer codes in one pass, then the scores are grouped with numpy (`np.maximum.at` for the maximum,
+    `np.bincount` for the mean). The best `k` files are picked with `np.argpartition`, so only those are sorted.
+    
+    Args:
+        paths (list[str]): The file path of each score, a file path may appear several times (one score per function).
+        scores (np.ndarray | list[float]): The scores.
+        k (int, optional): The number of files to return. Every file is returned when None.
+        how (str, optional): "max" or "mean", how the scores of a file are aggregated. Defaults to the `RANK_AGGREGATION` environment variable, or "max".
+    
+    Returns:
+        list[tuple[str, float]]: The (file path, score) pairs of the best files, sorted by decreasing score."""
+    how = how or os.getenv("RANK_AGGREGATION", "max")
+    scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+    if scores.shape[0] == 0:
+        return []
+    codes = {}
+    inverse = np.fromiter((codes.setdefault(path, len(codes)) for path in paths), dtype=np.intp, count=scores.shape[0])
+    files = list(codes)
+    
+    if how == "max":
+        file_scores = np.full(len(files), -np.inf, dtype=np.float32)
+        np.maximum.at(file_scores, inverse, scores)
+    elif how == "mean":
+        file_scores = np.bincount(inverse, weights=scores, minlength=len(files)) / np.bincount(inverse, minlength=len(files))
+    else:
+        raise ValueError(f"Unknown aggregation : {how}")
+    
+    if k is not None and k < len(files):
+        best = np.argpartition(-file_scores, k - 1)[:k] if k > 0 else np.empty(0, dtype=np.intp)
+    else:
+        best = np.arange(len(files))
+    best = best[np.argsort(-file_scores[best], kind="stable")]
+    return [(files[i], float(file_scores[i])) for i in best]
+
+def encode_ranking(ids, scores) -> bytes:
+    """Packs a full ranking into a blob.
+    
+    The blob starts with an 8 bytes header holding a format code and the number of entries,
+    followed by the little-endian int32 file ids, then the little-endian float32 scores.
+    
+    Args:
+        ids (list[int]): The database ids of the ranked files.
+        scores (list[float]): The score of each file.
+    
+    Returns:
+        bytes: The packed ranking."""
+    ids = np.asarray(ids, dtype="<i4")
+    scores = np.asarray(scores, dtype="<f4")
+    if ids.shape != scores.shape:
+        raise ValueError(f"{ids.shape[0]} ids for {scores.shape[0]} scores")
+    return RANKING_HEADER.pack(RANKING_CODE, ids.shape[0]) + ids.tobytes() + scores.tobytes()
+
+def decode_ranking(blob: bytes):
+    """Unpacks a blob written by `encode_ranking`.
+    
+    Args:
+        blob (bytes): The packed ranking.
+    
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The int32 file ids and their float32 scores."""
+    code, count = RANKING_HEADER.unpack_from(blob)
+    if code != RANKING_CODE:
+        raise ValueError(f"Unknown ranking format code : {code!r}")
+    ids = np.frombuffer(blob, dtype="<i4", count=count, offset=RANKING_HEADER.size).astype(np.int32)
+    scores = np.frombuffer(blob, dtype="<f4", count=count, offset=RANKING_HEADER.size + 4 * count).astype(np.float32)
+    return ids, scores
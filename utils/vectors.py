@@ -0,0 +1,63 @@
+import struct
+import numpy as np
+
+def to_float32(embedding):
+    """Converts an embedding to a flat float32 numpy array.
+    
+    Args:
+        embedding (torch.Tensor | np.ndarray | list): The embedding to convert. Torch tensors are moved to the cpu first.
+    
+    Returns:
+        np.ndarray: The embedding as a one-dimensional float32 array."""
+    if hasattr(embedding, "detach"):
+        embedding = embedding.detach().cpu().numpy()
+    return np.asarray(embedding, dtype=np.float32).reshape(-1)
+
+def stack_float32(embeddings, dim: int = 0):
+    """Stacks a list of embeddings into one contiguous float32 matrix.
+    
+    Args:
+        embeddings (list): The embeddings to stack, one per row.
+        dim (int): The dimension to use for the empty matrix when `embeddings` is empty.
+    
+    Returns:
+        np.ndarray: A C-contiguous float32 matrix of shape (len(embeddings), dim)."""
+    if not embeddings:
+        return np.empty((0, dim), dtype=np.float32)
+    return np.ascontiguousarray(np.stack([to_float32(embedding) for embedding in embeddings]))
+
+VECTOR_HEADER = struct.Struct("<4sI")
+FLOAT32_CODE = b"<f4\x00"
+TEXT_CODE = b"utf8"
+
+def encode_vector(embedding) -> bytes:
+    """Serializes an embedding without pickle.
+    
+    The blob starts with an 8 bytes header holding a dtype code and the dimension, followed by the raw data:
+    little-endian float32 values for vectors, or utf-8 bytes for the texts cached by Algorithmic.
+    
+    Args:
+        embedding (torch.Tensor | np.ndarray | list | str): The embedding to serialize.
+    
+    Returns:
+        bytes: The serialized embedding."""
+    if isinstance(embedding, str):
+        data = embedding.encode("utf-8")
+        return VECTOR_HEADER.pack(TEXT_CODE, len(data)) + data
+    vector = to_float32(embedding).astype("<f4", copy=False)
+    return VECTOR_HEADER.pack(FLOAT32_CODE, vector.shape[0]) + vector.tobytes()
+
+def decode_vector(blob: bytes):
+    """Deserializes a blob written by `encode_vector`.
+    
+    Args:
+        blob (bytes): The serialized embedding.
+    
+    Returns:
+        np.ndarray | str: A float32 array for vectors, a string for texts."""
+    code, dim = VECTOR_HEADER.unpack_from(blob)
+    if code == TEXT_CODE:
+        return bytes(blob[VECTOR_HEADER.size:VECTOR_HEADER.size + dim]).decode("utf-8")
+    if code != FLOAT32_CODE:
+        raise ValueError(f"Unknown embedding dtype code : {code!r}")
+    return np.frombuffer(blob, dtype="<f4", count=dim, offset=VECTOR_HEADER.size).astype(np.float32)
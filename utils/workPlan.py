@@ -0,0 +1,28 @@
+def plan_commits(issues, commit_times: dict = None):
+    """Groups the pending issues by base commit and orders the commits so that consecutive ones are close in history.
+    
+    Every commit is set up and embedded once for all the issues that share it. The commits are ordered by committer
+    time, so that the diff between two consecutive commits, and therefore the amount of code to re-embed, stays small.
+    Commits without a known time keep their order of appearance and come last.
+    
+    Args:
+        issues (list[tuple[str, str, str, int]]): The (title, body, sha, issueId) tuples of the pending issues. An issue listed more than once is only planned for its first commit.
+        commit_times (dict[str, int], optional): The committer timestamp of each commit.
+    
+    Returns:
+        list[tuple[str, list[tuple[str, str, int]]]]: The commits in processing order, each with the (title, body, issueId) tuples of its issues."""
+    commit_times = commit_times or {}
+    groups = {}
+    planned = set()
+    for title, body, sha, issueId in issues:
+        if issueId in planned:
+            continue
+        planned.add(issueId)
+        groups.setdefault(sha, []).append((title, body, issueId))
+    order = sorted(groups, key=lambda sha: (sha not in commit_times, commit_times.get(sha, 0)))
+    return [(sha, groups[sha]) for sha in order]
+
+
+def issue_text(title: str, body: str):
+    """Builds the text of an issue that is scored against the code."""
+    return title.join(', ' + body)